@@ -0,0 +1,60 @@
+import logging
+import os
+import threading
+import time
+from . import storage
+from .locking import file_lock
+
+logger = logging.getLogger(__name__)
+
+_stop = threading.Event()
+
+
+def _compact_once(interval):
+    """Compact unless another worker process is compacting or already did this interval"""
+    path = os.path.join(os.getenv("DATA_DIR", "./data"), "compaction")
+    with file_lock(path, blocking=False) as acquired:
+        if not acquired:
+            return
+
+        # Every worker runs a scheduler; the stamp's mtime records the last run by any of them
+        stamp = f"{path}.last"
+        try:
+            last_run = os.stat(stamp).st_mtime
+        except FileNotFoundError:
+            last_run = 0
+        if time.time() - last_run < interval * 0.9:
+            return
+
+        # compact() reports failures instead of raising; leave the stamp so the next tick retries
+        if "error" in storage.compact():
+            return
+        with open(stamp, 'a'):
+            os.utime(stamp)
+
+
+def _run_periodically(interval):
+    # Event.wait doubles as an interruptible sleep
+    while not _stop.wait(interval):
+        try:
+            _compact_once(interval)
+        except Exception as e:
+            logger.error(f"Scheduled compaction failed: {e}")
+
+
+def start_scheduler():
+    """Compact storage every COMPACTION_INTERVAL_SECONDS in a daemon thread; 0 disables it"""
+    interval = int(os.getenv("COMPACTION_INTERVAL_SECONDS", 3600))
+    if interval <= 0:
+        logger.info("Scheduled compaction disabled")
+        return None
+
+    _stop.clear()
+    thread = threading.Thread(target=_run_periodically, args=(interval,), name="compaction", daemon=True)
+    thread.start()
+    logger.info(f"Scheduled compaction every {interval}s")
+    return thread
+
+
+def stop_scheduler():
+    _stop.set()
@@ -10,6 +10,8 @@ class Config:
     APP_NAME = os.getenv("APP_NAME", "llm-transcript-rag")
     ENV = os.getenv("ENV", "dev")
     PORT = int(os.getenv("PORT", 8000))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "false").lower() == "true"
 
     # Storage paths
     DATA_DIR = os.getenv("DATA_DIR", "./data")
@@ -21,15 +23,51 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
     HF_EMBEDDING_MODEL = os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # Overrides the model's own max sequence length when set
+    EMBEDDING_MAX_TOKENS = os.getenv("EMBEDDING_MAX_TOKENS")
+
+    # Chunking
+    CHUNKING_MODE = os.getenv("CHUNKING_MODE", "characters")  # characters | tokens
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
+    CHUNK_SIZE_TOKENS = os.getenv("CHUNK_SIZE_TOKENS")  # defaults to the model's max sequence length
+    CHUNK_OVERLAP_TOKENS = os.getenv("CHUNK_OVERLAP_TOKENS")  # defaults to a fifth of the chunk size
 
     # LLM
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")  # defaults to http://localhost:11434
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+    # Load shedding: queries beyond this many concurrent LLM calls get an extractive answer
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
 
     # Firestore
     GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     FIRESTORE_PROJECT_ID = os.getenv("FIRESTORE_PROJECT_ID")
 
     # Caching
-    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 604800))  # 7 days
\ No newline at end of file
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 604800))  # 7 days
+    ERROR_TTL_SECONDS = int(os.getenv("ERROR_TTL_SECONDS", CACHE_TTL_SECONDS))
+    SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", CACHE_TTL_SECONDS))
+    SUMMARY_JOB_TTL_SECONDS = int(os.getenv("SUMMARY_JOB_TTL_SECONDS", 86400))  # finished jobs only
+    # Local JSON cache caps enforced by compaction, evicting least recently used answers; 0 = unlimited
+    CACHE_MAX_ENTRIES_PER_USER = int(os.getenv("CACHE_MAX_ENTRIES_PER_USER", 0))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 0))
+    CACHE_TOUCH_INTERVAL_SECONDS = int(os.getenv("CACHE_TOUCH_INTERVAL_SECONDS", 300))
+
+    # Compaction
+    COMPACTION_INTERVAL_SECONDS = int(os.getenv("COMPACTION_INTERVAL_SECONDS", 3600))  # 0 disables
+    COMPACTION_PAGE_SIZE = int(os.getenv("COMPACTION_PAGE_SIZE", 500))
+
+    # Responses larger than this many bytes are brotli/gzip compressed
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1000))
+
+    # Retrieval
+    SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", 8))  # vector searches run alongside BM25
+
+    # Summarization
+    SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", 4))
+    SUMMARY_FANOUT = int(os.getenv("SUMMARY_FANOUT", 4))
\ No newline at end of file
@@ -1,8 +1,16 @@
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_huggingface import HuggingFaceEmbeddings  # Updated import
+from functools import lru_cache
+import logging
 import os
 
+logger = logging.getLogger(__name__)
 
+# Context window of OpenAI's text-embedding-3 and ada-002 models
+OPENAI_EMBEDDING_MAX_TOKENS = 8191
+
+
+@lru_cache(maxsize=1)
 def get_embeddings():
     provider = os.getenv("EMBEDDINGS_PROVIDER", "huggingface")
 
@@ -16,4 +24,61 @@ def get_embeddings():
         return HuggingFaceEmbeddings(
             model_name=os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
             model_kwargs={'device': 'cpu'}  # Force CPU usage
-        )
\ No newline at end of file
+        )
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Return (encode, special_token_count) for the configured embedding model.
+
+    `encode` tokenizes text without special tokens; `special_token_count` is
+    how many the model adds around every input.
+    """
+    provider = os.getenv("EMBEDDINGS_PROVIDER", "huggingface")
+
+    if provider == "openai":
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"))
+        return encoding.encode_ordinary, 0
+    else:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(
+            os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        )
+        encode = lambda text: tokenizer.encode(text, add_special_tokens=False, verbose=False)
+        return encode, tokenizer.num_special_tokens_to_add()
+
+
+@lru_cache(maxsize=65536)
+def count_tokens(text: str) -> int:
+    """Number of embedding-model tokens in `text`, memoized since text splitters re-measure the same pieces"""
+    encode, _ = get_tokenizer()
+    return len(encode(text))
+
+
+@lru_cache(maxsize=1)
+def get_max_tokens() -> int:
+    """Largest number of text tokens the embedding model reads before truncating"""
+    if os.getenv("EMBEDDING_MAX_TOKENS"):
+        return int(os.getenv("EMBEDDING_MAX_TOKENS"))
+
+    if os.getenv("EMBEDDINGS_PROVIDER", "huggingface") == "openai":
+        return OPENAI_EMBEDDING_MAX_TOKENS
+
+    # sentence-transformers truncates at max_seq_length, which includes special tokens
+    _, special_tokens = get_tokenizer()
+    return get_embeddings()._client.max_seq_length - special_tokens
+
+
+def preload_models():
+    """Load the embedding model and tokenizer now rather than on first request.
+
+    Called in the parent process before workers are forked, so they share
+    the model weights copy-on-write instead of each loading its own copy.
+    """
+    get_embeddings()
+    try:
+        get_max_tokens()
+    except Exception as e:
+        logger.warning(f"Could not preload embedding tokenizer: {e}")
+    logger.info("Preloaded embedding model")
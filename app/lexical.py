@@ -0,0 +1,228 @@
+import logging
+import math
+import os
+import re
+import numpy as np
+from .manifest import collection_name
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and codes such as "gpt-4o" or "v2.1" stay single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+QUESTION_WORDS = {
+    "what", "why", "how", "when", "who", "where", "which", "whom", "whose",
+    "summarize", "summarise", "explain", "describe", "list", "compare", "discuss",
+    "is", "are", "was", "were", "do", "does", "did", "can", "could", "should", "would", "will", "any"
+}
+
+# Ignored when counting the words of a possible keyword lookup
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "with", "about", "and", "or"}
+
+# Codes and numbers such as "AB-1234", "v2.1" or "42"
+CODE_PATTERN = re.compile(r"\d|\w[-_.]\w")
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def quoted_phrases(query):
+    return [phrase.strip().lower() for phrase in PHRASE_PATTERN.findall(query) if phrase.strip()]
+
+
+def _looks_like_name_or_code(word, position):
+    word = word.strip(".,;:!")
+    if CODE_PATTERN.search(word):
+        return True
+    # Acronyms and mixed case ("ACME", "OpenAI"), or a capitalized word past the first
+    return word[1:] != word[1:].lower() or (position > 0 and word[:1].isupper())
+
+
+def is_keyword_lookup(query):
+    """Whether a query is clearly a name, code or phrase lookup rather than a question.
+
+    Such queries are answered from the lexical index alone, skipping the
+    query embedding. Besides quoted phrases, that means at most three words
+    (ignoring stopwords), no question mark or question word, and at least one
+    word that looks like a code, number or proper name.
+    """
+    if quoted_phrases(query):
+        return True
+    query = query.strip()
+    if query.endswith("?"):
+        return False
+
+    words = query.split()
+    if any(word.lower() in QUESTION_WORDS for word in words):
+        return False
+    content_words = [word for word in words if word.lower() not in STOPWORDS]
+    return (0 < len(content_words) <= 3 and
+            any(_looks_like_name_or_code(word, position) for position, word in enumerate(words)))
+
+
+class LexicalIndex:
+    """BM25 inverted index over a transcript's chunks.
+
+    Postings are stored term-major in flat numpy arrays (CSR layout): the
+    postings of term `t` are `doc_ids[offsets[t]:offsets[t + 1]]`, with
+    matching `term_freqs`. Document IDs are chunk indexes.
+    """
+
+    def __init__(self, terms, offsets, doc_ids, term_freqs, doc_lengths):
+        self.terms = list(terms)
+        self.vocabulary = {term: term_id for term_id, term in enumerate(self.terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+
+    @property
+    def doc_count(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def from_texts(cls, texts):
+        return cls([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                   np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)).extend(0, texts)
+
+    def extend(self, start_index, texts):
+        """Return a new index with documents from `start_index` on replaced by `texts`"""
+        terms = list(self.terms)
+        vocabulary = dict(self.vocabulary)
+
+        # Existing postings as (term, doc, tf) triples, minus replaced documents
+        posting_terms = np.repeat(np.arange(len(self.terms), dtype=np.int32), np.diff(self.offsets))
+        keep = self.doc_ids < start_index
+        term_parts = [posting_terms[keep]]
+        doc_parts = [self.doc_ids[keep]]
+        tf_parts = [self.term_freqs[keep]]
+
+        doc_lengths = list(self.doc_lengths[:start_index])
+        new_terms, new_docs, new_tfs = [], [], []
+        for offset, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                if token not in vocabulary:
+                    vocabulary[token] = len(terms)
+                    terms.append(token)
+                new_terms.append(vocabulary[token])
+                new_docs.append(start_index + offset)
+                new_tfs.append(count)
+
+        term_parts.append(np.array(new_terms, dtype=np.int32))
+        doc_parts.append(np.array(new_docs, dtype=np.int32))
+        tf_parts.append(np.array(new_tfs, dtype=np.int32))
+        posting_terms = np.concatenate(term_parts)
+        doc_ids = np.concatenate(doc_parts)
+        term_freqs = np.concatenate(tf_parts)
+
+        order = np.lexsort((doc_ids, posting_terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(terms)), out=offsets[1:])
+
+        return LexicalIndex(terms, offsets, doc_ids[order], term_freqs[order],
+                            np.array(doc_lengths, dtype=np.int32))
+
+    def search(self, query, k, lo=0, hi=None):
+        """Return up to `k` (chunk_index, score) pairs for `query`, limited to chunks in [lo, hi)"""
+        hi = self.doc_count if hi is None else hi
+        if self.doc_count == 0 or lo >= hi:
+            return []
+
+        scores = np.zeros(self.doc_count, dtype=np.float64)
+        average_length = max(float(self.doc_lengths.mean()), 1.0)
+        length_norm = K1 * (1 - B + B * self.doc_lengths / average_length)
+
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tfs = self.term_freqs[start:end]
+            idf = math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (K1 + 1) / (tfs + length_norm[docs])
+
+        window = scores[lo:hi]
+        candidates = np.flatnonzero(window > 0)
+        if len(candidates) == 0:
+            return []
+        top = candidates[np.argsort(-window[candidates], kind="stable")[:k]]
+        return [(int(lo + i), float(window[i])) for i in top]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.array(self.terms, dtype=np.str_),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["terms"].tolist(), data["offsets"], data["doc_ids"],
+                       data["term_freqs"], data["doc_lengths"])
+
+
+def index_path(user_id, transcript_id):
+    chroma_dir = os.getenv("CHROMA_DIR", "./data/chroma")
+    return os.path.join(chroma_dir, "lexical", f"{collection_name(user_id, transcript_id)}.npz")
+
+
+# Per-process cache of loaded indexes, invalidated by the file's mtime like the interval index
+_indexes = {}
+
+
+def load_index(user_id, transcript_id):
+    """Return the transcript's lexical index, or None if it was indexed before lexical search existed"""
+    path = index_path(user_id, transcript_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = collection_name(user_id, transcript_id)
+    cached = _indexes.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    index = LexicalIndex.load(path)
+    _indexes[key] = (mtime, index)
+    return index
+
+
+def build_index(user_id, transcript_id, chunks):
+    """Build and persist the lexical index for a freshly chunked transcript"""
+    index = LexicalIndex.from_texts([chunk["text"] for chunk in chunks])
+    index.save(index_path(user_id, transcript_id))
+    logger.info(f"Built lexical index for {transcript_id}: {len(index.terms)} terms, {len(index.doc_ids)} postings")
+    return index
+
+
+def update_index(user_id, transcript_id, start_index, chunks):
+    """Replace chunks from `start_index` on; callers hold the transcript's append lock"""
+    path = index_path(user_id, transcript_id)
+    index = load_index(user_id, transcript_id)
+    if index is None:
+        logger.warning(f"No lexical index for {transcript_id}; skipping lexical update")
+        return None
+
+    index = index.extend(start_index, [chunk["text"] for chunk in chunks])
+    index.save(path)
+    return index
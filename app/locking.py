@@ -0,0 +1,42 @@
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows; multi-worker mode is only supported on POSIX
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, shared=False, blocking=True):
+    """Hold an advisory lock on `path + ".lock"` across threads and worker processes.
+
+    Yields whether the lock was acquired, which is only ever False when
+    `blocking` is False and another holder has the lock.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(lock_file, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write_json(path, data, **kwargs):
+    """Write JSON to a temp file and rename it over `path`, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
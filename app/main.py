@@ -1,11 +1,16 @@
 import os
+import hashlib
 import logging
 import sys
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Form, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
+from contextlib import asynccontextmanager
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -23,23 +28,127 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=os.getenv("APP_NAME", "llm-transcript-rag"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    compaction.start_scheduler()
+    yield
+    compaction.stop_scheduler()
+
+
+app = FastAPI(title=os.getenv("APP_NAME", "llm-transcript-rag"), lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+# Compress larger responses with brotli when installed, falling back to gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+
+    app.add_middleware(BrotliMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1000)))
+except ImportError:
+    from starlette.middleware.gzip import GZipMiddleware
+
+    app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1000)))
+
 # Import after environment variables are loaded
-from . import storage, rag, utils
+from . import compaction, manifest, storage, rag, summarize, timing, utils
+from .embeddings import preload_models
+
+# Load models in the parent process so forked workers share them copy-on-write
+if os.getenv("PRELOAD_MODELS", "false").lower() == "true":
+    preload_models()
+
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Report per-stage durations (storage, retrieval, LLM) in the Server-Timing header"""
+    with timing.collect() as stages:
+        response = await call_next(request)
+    if stages:
+        response.headers["Server-Timing"] = timing.server_timing_header(stages)
+    return response
 
 
 class QueryRequest(BaseModel):
     user_id: str
     transcript_id: str
     query: str
+    # Optional time window, as "HH:MM:SS" or seconds
+    start: Optional[str] = None
+    end: Optional[str] = None
+    # "compact" returns chunk IDs, character offsets and timestamps instead of the chunk text
+    response_mode: Literal["full", "compact"] = "full"
+
+
+def compact_response(result):
+    """Drop the source chunk text from a /query result that carries chunk references"""
+    if "chunk_refs" not in result:
+        # Cached before chunk references existed; the text is all there is
+        return result
+    return {key: value for key, value in result.items() if key != "source_chunks"}
+
+
+def list_etag(user_id: str, scope: str, *params):
+    """Weak ETag for a user's listing, from the storage version counter and the request params.
+
+    Returns None when the version can't be read, which disables conditional requests.
+    """
+    version = storage.get_user_version(user_id, scope)
+    if version is None:
+        return None
+    digest = hashlib.sha1(repr((user_id, scope, params)).encode("utf-8")).hexdigest()[:16]
+    return f'W/"{scope}-{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]):
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def conditional_response(request: Request, etag: Optional[str], load):
+    """304 if the client's copy is current, otherwise the JSON from `load()` tagged with `etag`"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    with timing.stage("storage"):
+        content = load()
+    return JSONResponse(jsonable_encoder(content), headers=headers)
+
+
+def parse_time_window(request: QueryRequest):
+    """Return the request's (start, end) bounds in seconds and the cache key for the window"""
+    try:
+        start = utils.timestamp_to_seconds(request.start) if request.start is not None else None
+        end = utils.timestamp_to_seconds(request.end) if request.end is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    if start is None and end is None:
+        return None, None, None
+    window = f"{'' if start is None else start}-{'' if end is None else end}"
+    return start, end, window
+
+
+class SummarizeRequest(BaseModel):
+    user_id: str
+    transcript_id: str
+    # Run as a background job and poll /summaries/{job_id} for the result
+    background: bool = False
 
 
 @app.post("/upload")
@@ -75,45 +184,107 @@ async def upload_transcript(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@app.post("/transcripts/{transcript_id}/append")
+async def append_transcript(
+        transcript_id: str,
+        background_tasks: BackgroundTasks,
+        user_id: str = Form(...),
+        file: UploadFile = File(...)
+):
+    try:
+        if not file.filename.endswith('.txt'):
+            raise HTTPException(status_code=400, detail="Only text files are supported")
+
+        # Validate user access
+        if not storage.has_transcript_access(user_id, transcript_id):
+            raise HTTPException(status_code=403, detail="Access denied to transcript")
+
+        # Transcripts indexed before appends existed have no chunk manifest
+        if manifest.load_manifest(user_id, transcript_id) is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"No chunk manifest for transcript {transcript_id}; upload it again to enable appends"
+            )
+
+        content = await file.read()
+
+        # Process in background
+        background_tasks.add_task(
+            process_transcript_append,
+            content.decode('utf-8'),
+            user_id,
+            transcript_id
+        )
+
+        return {
+            "transcript_id": transcript_id,
+            "message": "Append started",
+            "user_id": user_id
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Append failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Append failed: {str(e)}")
+
+
 @app.post("/query")
 async def query_transcript(request: QueryRequest):
     try:
         # Validate user access
-        if not storage.has_transcript_access(request.user_id, request.transcript_id):
+        with timing.stage("access"):
+            has_access = storage.has_transcript_access(request.user_id, request.transcript_id)
+        if not has_access:
             raise HTTPException(status_code=403, detail="Access denied to transcript")
 
+        start, end, window = parse_time_window(request)
+
         # Check cache first
-        cached_response = storage.get_cached_response(
-            request.user_id,
-            request.transcript_id,
-            request.query
-        )
+        with timing.stage("cache_lookup"):
+            cached_response = storage.get_cached_response(
+                request.user_id,
+                request.transcript_id,
+                request.query,
+                window
+            )
         if cached_response:
+            if request.response_mode == "compact":
+                return compact_response(cached_response)
             return cached_response
 
-        # Process query
-        result = rag.process_query(
-            request.user_id,
-            request.transcript_id,
-            request.query
-        )
-
-        # Cache result
-        storage.cache_response(
+        # Process query off the event loop so slow LLM calls don't stall other requests
+        result = await run_in_threadpool(
+            rag.process_query,
             request.user_id,
             request.transcript_id,
             request.query,
-            result
+            start,
+            end
         )
 
-        # Save to query history
-        storage.save_query_history(
-            request.user_id,
-            request.transcript_id,
-            request.query,
-            result
-        )
+        # Cache result, unless it is a degraded answer produced under load
+        if not result.get("degraded"):
+            with timing.stage("cache_write"):
+                storage.cache_response(
+                    request.user_id,
+                    request.transcript_id,
+                    request.query,
+                    result,
+                    window
+                )
 
+        # Save to query history
+        with timing.stage("history_write"):
+            storage.save_query_history(
+                request.user_id,
+                request.transcript_id,
+                request.query,
+                result,
+                window
+            )
+
+        if request.response_mode == "compact":
+            return compact_response(result)
         return result
     except HTTPException:
         raise
@@ -122,28 +293,88 @@ async def query_transcript(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@app.post("/summarize")
+async def summarize_transcript(request: SummarizeRequest, background_tasks: BackgroundTasks):
+    try:
+        # Validate user access
+        if not storage.has_transcript_access(request.user_id, request.transcript_id):
+            raise HTTPException(status_code=403, detail="Access denied to transcript")
+
+        if request.background:
+            job_id = str(uuid.uuid4())
+            storage.save_summary_job(job_id, {
+                "job_id": job_id,
+                "user_id": request.user_id,
+                "transcript_id": request.transcript_id,
+                "status": "pending"
+            })
+            background_tasks.add_task(process_summary_job, job_id, request.user_id, request.transcript_id)
+            return {"job_id": job_id, "status": "pending"}
+
+        # Summaries make many LLM calls, so keep them off the event loop
+        return await run_in_threadpool(summarize.summarize_transcript, request.user_id, request.transcript_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Summarization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
+
+
+@app.get("/summaries/{job_id}")
+async def get_summary_job(job_id: str, user_id: str):
+    try:
+        job = storage.get_summary_job(job_id)
+        if not job or job.get("user_id") != user_id:
+            raise HTTPException(status_code=404, detail="Summary job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to fetch summary job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch summary job: {str(e)}")
+
+
 @app.get("/transcripts/{user_id}")
-async def get_transcripts(user_id: str):
+async def get_transcripts(user_id: str, request: Request):
     try:
-        return storage.get_user_transcripts(user_id)
+        # The version check is a single read, so unchanged polls skip the transcript scan
+        with timing.stage("version"):
+            etag = list_etag(user_id, "transcripts")
+        return conditional_response(request, etag, lambda: storage.get_user_transcripts(user_id))
     except Exception as e:
         logger.error(f"Failed to fetch transcripts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch transcripts: {str(e)}")
 
 
 @app.get("/query-history/{user_id}")
-async def get_query_history(user_id: str, transcript_id: Optional[str] = None, limit: int = 50):
+async def get_query_history(request: Request, user_id: str, transcript_id: Optional[str] = None, limit: int = 50):
     try:
         # Validate user access
         if transcript_id and not storage.has_transcript_access(user_id, transcript_id):
             raise HTTPException(status_code=403, detail="Access denied to transcript")
 
-        history = storage.get_query_history(user_id, transcript_id, limit)
-        return history
+        with timing.stage("version"):
+            etag = list_etag(user_id, "query_history", transcript_id, limit)
+        return conditional_response(
+            request, etag, lambda: storage.get_query_history(user_id, transcript_id, limit)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch query history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch query history: {str(e)}")
 
+
+@app.post("/admin/compact")
+async def compact_storage():
+    try:
+        # Compaction rewrites the whole local store, so keep it off the event loop
+        return await run_in_threadpool(storage.compact)
+    except Exception as e:
+        logger.error(f"Compaction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {str(e)}")
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -163,6 +394,33 @@ def process_transcript(content: str, user_id: str, transcript_id: str, name: str
         storage.save_processing_error(user_id, transcript_id, str(e))
 
 
+def process_transcript_append(content: str, user_id: str, transcript_id: str):
+    try:
+        chunks, embedded = rag.append_to_transcript(content, user_id, transcript_id)
+
+        storage.update_transcript_chunks(user_id, transcript_id, chunks)
+        if embedded:
+            # Answers cached before the append may miss the new content
+            storage.invalidate_cached_responses(user_id, transcript_id)
+
+        logger.info(f"Successfully appended to transcript: {transcript_id}, now {len(chunks)} chunks")
+    except Exception as e:
+        logger.error(f"Error appending to transcript: {str(e)}")
+        storage.save_processing_error(user_id, transcript_id, str(e))
+
+
+def process_summary_job(job_id: str, user_id: str, transcript_id: str):
+    job = {"job_id": job_id, "user_id": user_id, "transcript_id": transcript_id}
+    try:
+        storage.save_summary_job(job_id, {**job, "status": "running"})
+        result = summarize.summarize_transcript(user_id, transcript_id)
+        storage.save_summary_job(job_id, {**job, "status": "completed", "result": result})
+        logger.info(f"Summary job completed: {job_id}")
+    except Exception as e:
+        logger.error(f"Error in summary job: {str(e)}")
+        storage.save_summary_job(job_id, {**job, "status": "failed", "error": str(e)})
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from .locking import atomic_write_json
+from .utils import timestamp_to_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def collection_name(user_id, transcript_id):
+    return f"{user_id}_{transcript_id}"
+
+
+def chunk_id(transcript_id, index):
+    """Stable vector store ID for the chunk at `index` of a transcript"""
+    return f"{transcript_id}-{index:06d}"
+
+
+def chunk_hash(chunk):
+    """Content hash used to detect whether a chunk needs re-embedding"""
+    payload = f"{chunk['start_time']}|{chunk['end_time']}|{chunk['text']}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(user_id, transcript_id):
+    chroma_dir = os.getenv("CHROMA_DIR", "./data/chroma")
+    return os.path.join(chroma_dir, "manifests", f"{collection_name(user_id, transcript_id)}.json")
+
+
+def build_manifest(chunks, segments, segment_offset=0, previous_chunks=None, content_length=None):
+    """Build the chunk manifest for a transcript.
+
+    `chunks` are the chunk dicts produced by `chunk_transcript_with_timestamps`
+    over `segments`, whose first element is segment number `segment_offset`
+    of the whole transcript. `previous_chunks` are manifest entries that sit
+    before these chunks and are carried over unchanged. `content_length`
+    is the length of the transcript text so far, used to offset appends.
+    """
+    entries = list(previous_chunks or [])
+    for chunk in chunks:
+        entry = {
+            "id": chunk["id"],
+            "index": chunk["index"],
+            "hash": chunk_hash(chunk),
+            "start_time": chunk["start_time"],
+            "end_time": chunk["end_time"],
+            "start_seconds": timestamp_to_seconds(chunk["start_time"]),
+            "end_seconds": timestamp_to_seconds(chunk["end_time"]),
+            "first_segment": chunk["first_segment"] + segment_offset,
+            "last_segment": chunk["last_segment"] + segment_offset
+        }
+        # Token stats, so transcript totals can be recomputed after an append
+        if "token_count" in chunk:
+            entry["token_count"] = chunk["token_count"]
+            entry["truncated"] = chunk["truncated"]
+        entries.append(entry)
+
+    # Keep only the segments the last chunk starts in and after; an append
+    # re-chunks from there, so nothing earlier is needed again
+    tail_start = entries[-1]["first_segment"] if entries else segment_offset
+    return {
+        "chunks": entries,
+        "tail_segment_offset": tail_start,
+        "tail_segments": segments[tail_start - segment_offset:],
+        "segment_count": segment_offset + len(segments),
+        "content_length": content_length
+    }
+
+
+def split_for_append(manifest, new_segments):
+    """Split a manifest for appending `new_segments`.
+
+    Returns the chunk entries kept unchanged, the segments to re-chunk (the
+    stored tail followed by the new segments) and the transcript segment
+    number the first of them has.
+    """
+    old_chunks = manifest["chunks"]
+    tail_start = manifest["tail_segment_offset"]
+
+    # The old last segment ran to the end of the transcript; it now ends
+    # where the appended text begins
+    tail_segments = [dict(segment) for segment in manifest["tail_segments"]]
+    if tail_segments and new_segments:
+        tail_segments[-1]["end_time"] = new_segments[0]["start_time"]
+
+    # Chunks that start before the tail are kept unchanged. Some overlap into
+    # the tail, which only duplicates text the re-chunked tail also covers
+    kept = [c for c in old_chunks if c["first_segment"] < tail_start]
+    return kept, tail_segments + new_segments, tail_start
+
+
+def load_manifest(user_id, transcript_id):
+    path = manifest_path(user_id, transcript_id)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f"Corrupt chunk manifest at {path}: {e}")
+        return None
+
+
+def save_manifest(user_id, transcript_id, manifest):
+    path = manifest_path(user_id, transcript_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_json(path, manifest)
+
+
+# Per-process cache of interval indexes, keyed by collection. The manifest
+# file's mtime doubles as the invalidation signal, so workers that did not
+# perform an append still notice it with a single stat call
+_interval_indexes = {}
+
+
+def load_interval_index(user_id, transcript_id):
+    """Return the sorted (starts, running max of ends) arrays for a transcript's chunks.
+
+    Chunks are stored in transcript order, so their start times are sorted.
+    Taking the running maximum of end times keeps the second array sorted
+    too, which lets a time window be resolved with two binary searches.
+    Returns None when the transcript has no manifest.
+    """
+    path = manifest_path(user_id, transcript_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = collection_name(user_id, transcript_id)
+    cached = _interval_indexes.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    manifest = load_manifest(user_id, transcript_id)
+    if manifest is None:
+        return None
+
+    chunks = manifest["chunks"]
+    starts = [c.get("start_seconds", timestamp_to_seconds(c["start_time"])) for c in chunks]
+    ends = [c.get("end_seconds", timestamp_to_seconds(c["end_time"])) for c in chunks]
+    index = (starts, list(accumulate(ends, max)))
+    _interval_indexes[key] = (mtime, index)
+    return index
+
+
+def window_chunk_range(index, start=None, end=None):
+    """Resolve a time window to the half-open range of chunk indexes overlapping it"""
+    starts, max_ends = index
+    lo = 0 if start is None else bisect_left(max_ends, start)
+    hi = len(starts) if end is None else bisect_right(starts, end)
+    return lo, max(lo, hi)
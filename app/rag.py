@@ -1,53 +1,142 @@
 import logging
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from langchain.chains import RetrievalQA
 from langchain_community.llms import OpenAI
 from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from .embeddings import get_embeddings
-from .utils import parse_transcript, chunk_transcript_with_timestamps
+from .embeddings import count_tokens, get_embeddings, get_max_tokens
+from .utils import parse_transcript, chunk_transcript_with_timestamps, timestamp_to_seconds
+from .manifest import (
+    build_manifest, chunk_hash, chunk_id, collection_name, load_interval_index, load_manifest,
+    manifest_path, save_manifest, split_for_append, window_chunk_range
+)
+from .locking import file_lock
+from .resilience import admit, llm_breaker, llm_limiter
+from . import lexical, timing
+from concurrent.futures import ThreadPoolExecutor
+import math
 import os
+import re
 
 logger = logging.getLogger(__name__)
 
+# Runs the vector half of hybrid searches concurrently with BM25
+_search_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_THREADS", 8)), thread_name_prefix="search")
+
 
 def get_llm():
     provider = os.getenv("LLM_PROVIDER", "ollama")
+    timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
 
     if provider == "openai":
         return OpenAI(
             model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            request_timeout=timeout,
+            max_retries=0
         )
     else:
-        return OllamaLLM(model=os.getenv("OLLAMA_MODEL", "mistral"))
+        return OllamaLLM(
+            model=os.getenv("OLLAMA_MODEL", "mistral"),
+            base_url=os.getenv("OLLAMA_BASE_URL"),
+            client_kwargs={"timeout": timeout}
+        )
 
 
 def generate_embeddings(chunks):
     documents = []
     for chunk in chunks:
-        doc = Document(
-            page_content=chunk["text"],
-            metadata={
-                "start_time": chunk["start_time"],
-                "end_time": chunk["end_time"],
-                "chunk_id": f"{chunk['start_time']}-{chunk['end_time']}"
-            }
-        )
+        metadata = {
+            "start_time": chunk["start_time"],
+            "end_time": chunk["end_time"],
+            "start_seconds": timestamp_to_seconds(chunk["start_time"]),
+            "end_seconds": timestamp_to_seconds(chunk["end_time"]),
+            "chunk_id": chunk["id"],
+            "chunk_index": chunk["index"]
+        }
+        # Character range in the uploaded transcript, when known
+        if chunk.get("char_start") is not None:
+            metadata["char_start"] = chunk["char_start"]
+            metadata["char_end"] = chunk["char_end"]
+
+        doc = Document(page_content=chunk["text"], metadata=metadata)
         documents.append(doc)
     return documents
 
 
+def assign_chunk_ids(chunks, transcript_id, start_index=0):
+    """Give each chunk a stable, position-based ID"""
+    for offset, chunk in enumerate(chunks):
+        chunk["index"] = start_index + offset
+        chunk["id"] = chunk_id(transcript_id, chunk["index"])
+    return chunks
+
+
+def chunk_segments(segments):
+    """Chunk parsed segments according to CHUNKING_MODE and annotate token counts.
+
+    In "tokens" mode chunk size and overlap are measured with the embedding
+    model's tokenizer and capped at its max sequence length, so no chunk text
+    is silently truncated during embedding. "characters" mode keeps the
+    character-based CHUNK_SIZE/CHUNK_OVERLAP. Either way each chunk gets a
+    `token_count` and a `truncated` flag when the tokenizer is available.
+    """
+    try:
+        max_tokens = get_max_tokens()
+        # get_max_tokens doesn't load the tokenizer for every provider; make sure it works
+        count_tokens("")
+    except Exception as e:
+        logger.warning(f"Embedding tokenizer unavailable, using character chunking: {e}")
+        max_tokens = None
+
+    if os.getenv("CHUNKING_MODE", "characters") == "tokens" and max_tokens:
+        chunk_size = min(int(os.getenv("CHUNK_SIZE_TOKENS", max_tokens)), max_tokens)
+        chunk_overlap = int(os.getenv("CHUNK_OVERLAP_TOKENS", chunk_size // 5))
+        chunks = chunk_transcript_with_timestamps(segments, chunk_size, chunk_overlap, length_function=count_tokens)
+    else:
+        chunks = chunk_transcript_with_timestamps(
+            segments,
+            int(os.getenv("CHUNK_SIZE", 1000)),
+            int(os.getenv("CHUNK_OVERLAP", 200))
+        )
+
+    if max_tokens:
+        # Token stats are informational; never let them fail an upload
+        try:
+            for chunk in chunks:
+                chunk["token_count"] = count_tokens(chunk["text"])
+                chunk["truncated"] = chunk["token_count"] > max_tokens
+            truncated = sum(chunk["truncated"] for chunk in chunks)
+            total_tokens = sum(chunk["token_count"] for chunk in chunks)
+            logger.info(f"Chunked {len(segments)} segments into {len(chunks)} chunks, "
+                        f"{total_tokens} tokens, {truncated} truncated at {max_tokens} tokens")
+        except Exception as e:
+            logger.warning(f"Could not count chunk tokens: {e}")
+            for chunk in chunks:
+                chunk.pop("token_count", None)
+                chunk.pop("truncated", None)
+
+    return chunks
+
+
+def get_vectorstore(user_id, transcript_id):
+    return Chroma(
+        collection_name=collection_name(user_id, transcript_id),
+        persist_directory=os.getenv("CHROMA_DIR", "./data/chroma"),
+        embedding_function=get_embeddings()
+    )
+
+
 def store_embeddings(documents, user_id, transcript_id):
     """Store document embeddings in Chroma vector database"""
     try:
         vectorstore = Chroma.from_documents(
             documents=documents,
             embedding=get_embeddings(),
+            ids=[doc.metadata["chunk_id"] for doc in documents],
             persist_directory=os.getenv("CHROMA_DIR", "./data/chroma"),
-            collection_name=f"{user_id}_{transcript_id}"
+            collection_name=collection_name(user_id, transcript_id)
         )
         logger.info(f"Stored embeddings for {len(documents)} chunks in ChromaDB")
         return vectorstore
@@ -60,7 +149,7 @@ def process_and_store_transcript(content: str, user_id: str, transcript_id: str)
     """Process transcript with proper chunking and store embeddings"""
     # Parse and chunk transcript
     segments = parse_transcript(content)
-    chunks = chunk_transcript_with_timestamps(segments)
+    chunks = assign_chunk_ids(chunk_segments(segments), transcript_id)
 
     # Generate embeddings
     documents = generate_embeddings(chunks)
@@ -68,15 +157,162 @@ def process_and_store_transcript(content: str, user_id: str, transcript_id: str)
     # Store in vector database
     vectorstore = store_embeddings(documents, user_id, transcript_id)
 
+    # Build the BM25 index alongside it for keyword and hybrid search
+    lexical.build_index(user_id, transcript_id, chunks)
+
+    # Record chunk hashes and the tail segments so later appends can
+    # re-chunk incrementally
+    save_manifest(user_id, transcript_id, build_manifest(chunks, segments, content_length=len(content)))
+
     return chunks, vectorstore
 
 
-def process_query(user_id, transcript_id, query):
-    vectorstore = Chroma(
-        collection_name=f"{user_id}_{transcript_id}",
-        persist_directory=os.getenv("CHROMA_DIR", "./data/chroma"),
-        embedding_function=get_embeddings()
-    )
+def append_to_transcript(content: str, user_id: str, transcript_id: str):
+    """Index newly appended transcript text without reprocessing the whole transcript.
+
+    Only the new segments are parsed. Chunks touching the previous tail are
+    re-chunked together with them, and only chunks whose content changed are
+    embedded and upserted. Returns the transcript's chunk manifest entries
+    and the number of chunks that were embedded.
+    """
+    with file_lock(manifest_path(user_id, transcript_id)):
+        manifest = load_manifest(user_id, transcript_id)
+        if manifest is None:
+            raise ValueError(f"No chunk manifest for transcript {transcript_id}; upload it again to enable appends")
+
+        # Offsets of appended text continue from the end of the transcript so far
+        content_length = manifest["content_length"]
+        new_segments = parse_transcript(content, base_offset=content_length)
+        old_chunks = manifest["chunks"]
+        if not new_segments:
+            return old_chunks, 0
+
+        kept, segments, tail_start = split_for_append(manifest, new_segments)
+        new_chunks = assign_chunk_ids(
+            chunk_segments(segments),
+            transcript_id,
+            start_index=len(kept)
+        )
+
+        old_hashes = {c["index"]: c["hash"] for c in old_chunks}
+        changed = [c for c in new_chunks if old_hashes.get(c["index"]) != chunk_hash(c)]
+        stale_ids = [c["id"] for c in old_chunks if c["index"] >= len(kept) + len(new_chunks)]
+
+        vectorstore = get_vectorstore(user_id, transcript_id)
+        if changed:
+            documents = generate_embeddings(changed)
+            vectorstore.add_documents(documents, ids=[doc.metadata["chunk_id"] for doc in documents])
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+        lexical.update_index(user_id, transcript_id, len(kept), new_chunks)
+
+        updated = build_manifest(
+            new_chunks,
+            segments,
+            segment_offset=tail_start,
+            previous_chunks=kept,
+            content_length=content_length + len(content)
+        )
+        save_manifest(user_id, transcript_id, updated)
+
+        logger.info(f"Appended {len(new_segments)} segments to {transcript_id}: "
+                    f"embedded {len(changed)} of {len(updated['chunks'])} chunks")
+        return updated["chunks"], len(changed)
+
+
+def _vector_search(vectorstore, query, k, where=None):
+    if where is None:
+        return vectorstore.similarity_search(query, k=k)
+    return vectorstore.similarity_search(query, k=k, filter=where)
+
+
+def fetch_chunks(vectorstore, transcript_id, indexes):
+    """Load chunks by index, in the given order, without embedding anything"""
+    if not indexes:
+        return []
+    found = vectorstore.get(ids=[chunk_id(transcript_id, index) for index in indexes])
+    by_index = {
+        metadata.get("chunk_index"): Document(page_content=text, metadata=metadata)
+        for text, metadata in zip(found["documents"], found["metadatas"])
+    }
+    return [by_index[index] for index in indexes if index in by_index]
+
+
+def lexical_search(vectorstore, index, transcript_id, query, k, lo=0, hi=None):
+    """BM25 search over the transcript's lexical index; quoted phrases must appear verbatim"""
+    phrases = lexical.quoted_phrases(query)
+    # Over-fetch when phrases will filter the hits down
+    hits = index.search(query, k * 5 if phrases else k, lo, hi)
+    documents = fetch_chunks(vectorstore, transcript_id, [chunk_index for chunk_index, _ in hits])
+    if phrases:
+        documents = [doc for doc in documents if all(phrase in doc.page_content.lower() for phrase in phrases)]
+    return documents[:k]
+
+
+def reciprocal_rank_fusion(rankings, k, constant=60):
+    """Merge ranked document lists by summing 1 / (constant + rank) across lists"""
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc.metadata.get("chunk_id", doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (constant + rank + 1)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+def retrieve_chunks(vectorstore, user_id, transcript_id, query, start=None, end=None, k=4):
+    """Hybrid lexical and vector search, optionally restricted to chunks overlapping [start, end] seconds"""
+    lo, hi, where = 0, None, None
+    if start is not None or end is not None:
+        interval_index = load_interval_index(user_id, transcript_id)
+        if interval_index is None:
+            # No manifest to prefilter with; fall back to filtering on chunk metadata
+            conditions = []
+            if end is not None:
+                conditions.append({"start_seconds": {"$lte": end}})
+            if start is not None:
+                conditions.append({"end_seconds": {"$gte": start}})
+            where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+            return _vector_search(vectorstore, query, k, where)
+
+        lo, hi = window_chunk_range(interval_index, start, end)
+        if lo >= hi:
+            return []
+
+        where = {"$and": [{"chunk_index": {"$gte": lo}}, {"chunk_index": {"$lt": hi}}]}
+        if hi - lo <= k:
+            # Every candidate would be returned anyway, so skip embedding the query
+            return fetch_chunks(vectorstore, transcript_id, list(range(lo, hi)))
+
+    index = lexical.load_index(user_id, transcript_id)
+    if index is None:
+        return _vector_search(vectorstore, query, k, where)
+
+    if lexical.is_keyword_lookup(query):
+        # Names, codes and quoted phrases: BM25 alone, without embedding the query
+        documents = lexical_search(vectorstore, index, transcript_id, query, k, lo, hi)
+        if documents:
+            return documents
+
+    # Embed and search in the pool while BM25 runs here, then fuse the rankings
+    vector_future = _search_pool.submit(_vector_search, vectorstore, query, k, where)
+    lexical_documents = lexical_search(vectorstore, index, transcript_id, query, k, lo, hi)
+    return reciprocal_rank_fusion([vector_future.result(), lexical_documents], k)
+
+
+def process_query(user_id, transcript_id, query, start=None, end=None):
+    vectorstore = get_vectorstore(user_id, transcript_id)
+
+    with timing.stage("retrieval"):
+        source_documents = retrieve_chunks(vectorstore, user_id, transcript_id, query, start, end)
+    if not source_documents:
+        return {
+            "answer": "No transcript content falls within the requested time window.",
+            "timestamps": [],
+            "source_chunks": [],
+            "chunk_refs": []
+        }
 
     # Create a custom prompt for better results
     prompt_template = """Use the following pieces of context to answer the question at the end. 
@@ -92,30 +328,96 @@ def process_query(user_id, transcript_id, query):
         template=prompt_template, input_variables=["context", "question"]
     )
 
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=get_llm(),
-        chain_type="stuff",
-        retriever=vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 4}
-        ),
-        chain_type_kwargs={"prompt": PROMPT},
-        return_source_documents=True
-    )
+    # Shed load instead of queueing behind a saturated or failing LLM
+    refused = admit(llm_breaker, llm_limiter)
+    if refused:
+        return degraded_response(query, source_documents, f"llm_{refused}")
 
-    result = qa_chain.invoke({"query": query})
+    try:
+        # Stuff the retrieved chunks into a single prompt
+        context = "\n\n".join(doc.page_content for doc in source_documents)
+        with timing.stage("llm"):
+            answer = get_llm().invoke(PROMPT.format(context=context, question=query))
+        llm_breaker.record_success()
+    except Exception as e:
+        llm_breaker.record_failure()
+        logger.warning(f"LLM call failed, returning extractive answer: {e}")
+        return degraded_response(query, source_documents, "llm_error")
+    finally:
+        llm_limiter.release()
 
-    # Extract timestamps from source documents
+    return {
+        "answer": answer,
+        "timestamps": extract_timestamps(source_documents),
+        "source_chunks": [doc.page_content for doc in source_documents],
+        "chunk_refs": extract_chunk_refs(source_documents)
+    }
+
+
+def extract_timestamps(source_documents):
     timestamps = []
-    for doc in result["source_documents"]:
+    for doc in source_documents:
         if "start_time" in doc.metadata and "end_time" in doc.metadata:
             timestamps.append({
                 "start": doc.metadata["start_time"],
                 "end": doc.metadata["end_time"]
             })
+    return timestamps
+
+
+def extract_chunk_refs(source_documents):
+    """Chunk IDs, character offsets and timestamps, for clients that hold the transcript text"""
+    return [
+        {
+            "chunk_id": doc.metadata.get("chunk_id"),
+            "chunk_index": doc.metadata.get("chunk_index"),
+            "char_start": doc.metadata.get("char_start"),
+            "char_end": doc.metadata.get("char_end"),
+            "start": doc.metadata.get("start_time"),
+            "end": doc.metadata.get("end_time")
+        }
+        for doc in source_documents
+    ]
+
+
+def extractive_answer(query, source_documents, max_sentences=3):
+    """Answer with the retrieved sentences most similar to the query, without calling the LLM"""
+    sentences = []
+    for doc in source_documents:
+        for sentence in re.split(r'(?<=[.!?])\s+', doc.page_content):
+            if sentence.strip():
+                sentences.append((sentence.strip(), doc.metadata.get("start_time")))
+    if not sentences:
+        return ""
+
+    embeddings = get_embeddings()
+    query_vector = embeddings.embed_query(query)
+    sentence_vectors = embeddings.embed_documents([sentence for sentence, _ in sentences])
+
+    def cosine(a, b):
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b))
+        return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+    scores = [cosine(query_vector, vector) for vector in sentence_vectors]
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_sentences]
+
+    parts = []
+    for i in ranked:
+        sentence, start_time = sentences[i]
+        parts.append(f"[{start_time}] {sentence}" if start_time else sentence)
+    return " ".join(parts)
+
 
+def degraded_response(query, source_documents, reason):
+    """Retrieval-only response used when the LLM is overloaded or failing"""
+    logger.info(f"Serving degraded response: {reason}")
+    with timing.stage("extractive"):
+        answer = extractive_answer(query, source_documents)
     return {
-        "answer": result["result"],
-        "timestamps": timestamps,
-        "source_chunks": [doc.page_content for doc in result["source_documents"]]
-    }
\ No newline at end of file
+        "answer": answer,
+        "timestamps": extract_timestamps(source_documents),
+        "source_chunks": [doc.page_content for doc in source_documents],
+        "chunk_refs": extract_chunk_refs(source_documents),
+        "degraded": True,
+        "degraded_reason": reason
+    }
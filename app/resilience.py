@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency until it has had time to recover.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    `allow()` refuses calls for `reset_seconds`. It then lets a single trial
+    call through; success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit breaker {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"Circuit breaker {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ConcurrencyLimiter:
+    """Counts in-flight calls and refuses new ones beyond `max_in_flight` instead of queueing them.
+
+    Background work that should wait rather than be refused uses `acquire()`.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Condition()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def try_acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self, timeout=None):
+        """Wait up to `timeout` seconds (forever if None) for a free slot"""
+        with self._lock:
+            if not self._lock.wait_for(lambda: self._in_flight < self.max_in_flight, timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._lock.notify()
+
+
+def admit(breaker, limiter, wait=False):
+    """Take a limiter slot, then ask the breaker; return None if the call may go ahead.
+
+    Otherwise returns why not ("overloaded" or "unavailable") and holds nothing.
+    The limiter goes first so a call shed for load never claims the breaker's
+    half-open trial, which only a recorded success or failure releases. With
+    `wait`, block for a slot instead of shedding.
+    """
+    if wait:
+        limiter.acquire()
+    elif not limiter.try_acquire():
+        return "overloaded"
+    if not breaker.allow():
+        limiter.release()
+        return "unavailable"
+    return None
+
+
+llm_breaker = CircuitBreaker(
+    "llm",
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+    reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+)
+
+llm_limiter = ConcurrencyLimiter(int(os.getenv("LLM_MAX_IN_FLIGHT", 8)))
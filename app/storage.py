@@ -2,12 +2,69 @@ import json
 import os
 import logging
 import uuid  # Add this import
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from .locking import atomic_write_json, file_lock
 from .firestore import get_firestore_client
 from google.cloud import firestore
 
 logger = logging.getLogger(__name__)
 
+# Parsed local JSON stores, keyed by path, with the file signature they were read at
+_parsed_stores = {}
+
+# When this process last logged a hit on each cached answer, to throttle access log writes
+_last_touched = {}
+
+
+def _expiring_sections():
+    """(collection, TTL in seconds) for every store section that compaction expires"""
+    cache_ttl = int(os.getenv("CACHE_TTL_SECONDS", 604800))
+    return [
+        ("queries", cache_ttl),
+        ("errors", int(os.getenv("ERROR_TTL_SECONDS", cache_ttl))),
+        ("summaries", int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", cache_ttl))),
+        ("summary_jobs", int(os.getenv("SUMMARY_JOB_TTL_SECONDS", 86400))),
+    ]
+
+
+def _is_expired(entry, ttl):
+    # Entries without a timestamp (unfinished summary jobs) never expire
+    if "timestamp" not in entry:
+        return False
+    return (datetime.now() - datetime.fromisoformat(entry["timestamp"])).total_seconds() >= ttl
+
+
+def _summary_job_record(job):
+    """Stamp a summary job; finished jobs get the `timestamp` their TTL counts from"""
+    now = datetime.now().isoformat()
+    record = {**job, "updated": now}
+    if job.get("status") in ("completed", "failed"):
+        record["timestamp"] = now
+    return record
+
+
+def _bump_version(data, user_id, scope):
+    """Advance a user's version counter for `scope` inside a local JSON transaction"""
+    versions = data.setdefault("versions", {}).setdefault(user_id, {})
+    versions[scope] = versions.get(scope, 0) + 1
+
+
+def chunking_stats(chunks):
+    """Token totals for transcript metadata, when chunks were measured with the embedding tokenizer"""
+    if not chunks or any("token_count" not in chunk for chunk in chunks):
+        return {}
+    return {
+        "token_count": sum(chunk["token_count"] for chunk in chunks),
+        "truncated_chunks": sum(chunk["truncated"] for chunk in chunks)
+    }
+
+
+def updated_chunking_stats(chunks):
+    """Token totals for a metadata update; unknown totals replace stale ones with None"""
+    return chunking_stats(chunks) or {"token_count": None, "truncated_chunks": None}
+
 
 def get_db():
     firestore_client = get_firestore_client()
@@ -22,40 +79,105 @@ class LocalJSONDB:
     def __init__(self):
         self.path = os.getenv("LOCAL_JSON_DB", "./data/local_store.json")
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Cache hits are appended here and folded into the store by compaction
+        self.access_log_path = f"{self.path}.access.log"
         logger.info(f"Local JSON DB path: {self.path}")
 
-    def _read_data(self):
+    def _load_data(self):
         try:
             with open(self.path, 'r') as f:
                 return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
             return {"transcripts": {}, "queries": {}, "errors": {}, "query_history": {}}
 
+    def _read_data(self):
+        """Read the store, reusing this process's parsed copy while the file is unchanged.
+
+        Writes always replace the file, so its (inode, mtime, size) signature
+        tells every worker process when its copy is stale. The returned data
+        is shared and must not be mutated; use `_transaction` to modify it.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._load_data()
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = _parsed_stores.get(self.path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        data = self._load_data()
+        _parsed_stores[self.path] = (signature, data)
+        return data
+
     def _write_data(self, data):
-        with open(self.path, 'w') as f:
-            json.dump(data, f, default=str)
+        atomic_write_json(self.path, data, default=str)
+
+    @contextmanager
+    def _transaction(self):
+        """Read-modify-write the store under a lock shared by all worker processes"""
+        with file_lock(self.path):
+            data = self._load_data()
+            yield data
+            self._write_data(data)
 
     def save_transcript_metadata(self, user_id, transcript_id, name, chunks):
         try:
-            data = self._read_data()
             metadata = {
                 "user_id": user_id,
                 "transcript_id": transcript_id,
                 "name": name,
                 "upload_date": datetime.now().isoformat(),
                 "chunk_count": len(chunks),
-                "status": "processed"
+                "status": "processed",
+                **chunking_stats(chunks)
             }
 
-            if "transcripts" not in data:
-                data["transcripts"] = {}
+            with self._transaction() as data:
+                if "transcripts" not in data:
+                    data["transcripts"] = {}
 
-            data["transcripts"][transcript_id] = metadata
-            self._write_data(data)
+                data["transcripts"][transcript_id] = metadata
+                _bump_version(data, user_id, "transcripts")
             logger.info(f"Saved transcript metadata to local JSON: {transcript_id}")
         except Exception as e:
             logger.error(f"Error saving transcript metadata to local JSON: {e}")
 
+    def update_transcript_chunks(self, user_id, transcript_id, chunks):
+        try:
+            if not self.has_transcript_access(user_id, transcript_id):
+                logger.warning(f"Transcript not found in local JSON: {transcript_id}")
+                return
+
+            with self._transaction() as data:
+                transcript = data["transcripts"][transcript_id]
+                transcript["chunk_count"] = len(chunks)
+                transcript.update(updated_chunking_stats(chunks))
+                transcript["updated_date"] = datetime.now().isoformat()
+                _bump_version(data, user_id, "transcripts")
+            logger.info(f"Updated chunk count in local JSON: {transcript_id}")
+        except Exception as e:
+            logger.error(f"Error updating chunk count in local JSON: {e}")
+
+    def invalidate_cached_responses(self, user_id, transcript_id):
+        try:
+            def is_stale(query_data):
+                return query_data.get("user_id") == user_id and query_data.get("transcript_id") == transcript_id
+
+            # Check the cached copy first to skip a rewrite when there is nothing to drop
+            if not any(is_stale(query_data) for query_data in self._read_data().get("queries", {}).values()):
+                return
+
+            with self._transaction() as data:
+                queries = data.get("queries", {})
+                stale = [query_id for query_id, query_data in queries.items() if is_stale(query_data)]
+                for query_id in stale:
+                    del queries[query_id]
+            logger.info(f"Invalidated {len(stale)} cached responses in local JSON: {transcript_id}")
+        except Exception as e:
+            logger.error(f"Error invalidating cached responses in local JSON: {e}")
+
     def has_transcript_access(self, user_id, transcript_id):
         try:
             data = self._read_data()
@@ -65,7 +187,7 @@ class LocalJSONDB:
             logger.error(f"Error checking transcript access in local JSON: {e}")
             return False
 
-    def get_cached_response(self, user_id, transcript_id, query):
+    def get_cached_response(self, user_id, transcript_id, query, window=None):
         try:
             # Find all queries for this user and transcript
             data = self._read_data()
@@ -74,10 +196,12 @@ class LocalJSONDB:
             for query_id, query_data in data.get("queries", {}).items():
                 if (query_data.get("user_id") == user_id and
                         query_data.get("transcript_id") == transcript_id and
-                        query_data.get("query") == query):
+                        query_data.get("query") == query and
+                        query_data.get("window") == window):
 
                     cache_time = datetime.fromisoformat(query_data["timestamp"])
                     if (datetime.now() - cache_time).total_seconds() < ttl:
+                        self._touch_cached_response(query_id, query_data)
                         return query_data["response"]
 
             return None
@@ -85,7 +209,44 @@ class LocalJSONDB:
             logger.error(f"Error getting cached response from local JSON: {e}")
             return None
 
-    def cache_response(self, user_id, transcript_id, query, response):
+    def _touch_cached_response(self, query_id, query_data):
+        """Record a cache hit for LRU eviction, at most once per CACHE_TOUCH_INTERVAL_SECONDS per entry.
+
+        Hits go to an append-only log rather than the store, so reads never
+        take the store lock or rewrite it; compaction applies them.
+        """
+        interval = int(os.getenv("CACHE_TOUCH_INTERVAL_SECONDS", 300))
+        last_accessed = datetime.fromisoformat(query_data.get("last_accessed", query_data["timestamp"]))
+        last_accessed = max(last_accessed, _last_touched.get(query_id, last_accessed))
+        now = datetime.now()
+        if (now - last_accessed).total_seconds() < interval:
+            return
+
+        if len(_last_touched) > 10000:
+            _last_touched.clear()
+        _last_touched[query_id] = now
+        # A single short append is atomic across processes, so no lock is needed
+        with open(self.access_log_path, 'a') as f:
+            f.write(f"{query_id} {now.isoformat()}\n")
+
+    def _drain_access_log(self):
+        """Return {query_id: latest logged hit} and start a new log"""
+        draining_path = f"{self.access_log_path}.{os.getpid()}.draining"
+        try:
+            os.replace(self.access_log_path, draining_path)
+        except FileNotFoundError:
+            return {}
+
+        accesses = {}
+        with open(draining_path, 'r') as f:
+            for line in f:
+                query_id, _, accessed = line.strip().partition(" ")
+                if accessed:
+                    accesses[query_id] = max(accessed, accesses.get(query_id, accessed))
+        os.remove(draining_path)
+        return accesses
+
+    def cache_response(self, user_id, transcript_id, query, response, window=None):
         try:
             # Generate a unique query ID
             query_id = str(uuid.uuid4())
@@ -95,16 +256,16 @@ class LocalJSONDB:
                 "user_id": user_id,
                 "transcript_id": transcript_id,
                 "query": query,
+                "window": window,
                 "response": response,
                 "timestamp": datetime.now().isoformat()
             }
 
-            data = self._read_data()
-            if "queries" not in data:
-                data["queries"] = {}
+            with self._transaction() as data:
+                if "queries" not in data:
+                    data["queries"] = {}
 
-            data["queries"][query_id] = cache_data
-            self._write_data(data)
+                data["queries"][query_id] = cache_data
             logger.info(f"Cached response in local JSON: {query_id}")
         except Exception as e:
             logger.error(f"Error caching response in local JSON: {e}")
@@ -118,12 +279,11 @@ class LocalJSONDB:
                 "timestamp": datetime.now().isoformat()
             }
 
-            data = self._read_data()
-            if "errors" not in data:
-                data["errors"] = {}
+            with self._transaction() as data:
+                if "errors" not in data:
+                    data["errors"] = {}
 
-            data["errors"][transcript_id] = error_data
-            self._write_data(data)
+                data["errors"][transcript_id] = error_data
             logger.info(f"Saved processing error to local JSON: {transcript_id}")
         except Exception as e:
             logger.error(f"Error saving processing error to local JSON: {e}")
@@ -165,7 +325,7 @@ class LocalJSONDB:
             logger.error(f"Error getting query history from local JSON: {e}")
             return []
 
-    def save_query_history(self, user_id: str, transcript_id: str, query: str, response: dict):
+    def save_query_history(self, user_id: str, transcript_id: str, query: str, response: dict, window: str = None):
         """Save complete query history"""
         try:
             query_id = str(uuid.uuid4())
@@ -174,21 +334,126 @@ class LocalJSONDB:
                 "user_id": user_id,
                 "transcript_id": transcript_id,
                 "query": query,
+                "window": window,
                 "response": response,
                 "timestamp": datetime.now().isoformat(),
                 "type": "query_history"
             }
 
-            data = self._read_data()
-            if "query_history" not in data:
-                data["query_history"] = {}
+            with self._transaction() as data:
+                if "query_history" not in data:
+                    data["query_history"] = {}
 
-            data["query_history"][query_id] = query_data
-            self._write_data(data)
+                data["query_history"][query_id] = query_data
+                _bump_version(data, user_id, "query_history")
             logger.info(f"Saved query history to local JSON: {query_id}")
         except Exception as e:
             logger.error(f"Error saving query history to local JSON: {e}")
 
+    def get_user_version(self, user_id, scope):
+        """Counter bumped on every write to the user's `scope` ("transcripts" or "query_history")"""
+        try:
+            return self._read_data().get("versions", {}).get(user_id, {}).get(scope, 0)
+        except Exception as e:
+            logger.error(f"Error getting user version from local JSON: {e}")
+            return None
+
+    def get_cached_summaries(self, keys):
+        try:
+            summaries = self._read_data().get("summaries", {})
+            return {key: summaries[key]["summary"] for key in keys if key in summaries}
+        except Exception as e:
+            logger.error(f"Error getting cached summaries from local JSON: {e}")
+            return {}
+
+    def cache_summaries(self, summaries):
+        try:
+            with self._transaction() as data:
+                if "summaries" not in data:
+                    data["summaries"] = {}
+
+                timestamp = datetime.now().isoformat()
+                for key, summary in summaries.items():
+                    data["summaries"][key] = {"summary": summary, "timestamp": timestamp}
+            logger.info(f"Cached {len(summaries)} summaries in local JSON")
+        except Exception as e:
+            logger.error(f"Error caching summaries in local JSON: {e}")
+
+    def save_summary_job(self, job_id, job):
+        try:
+            with self._transaction() as data:
+                if "summary_jobs" not in data:
+                    data["summary_jobs"] = {}
+
+                data["summary_jobs"][job_id] = _summary_job_record(job)
+            logger.info(f"Saved summary job to local JSON: {job_id}")
+        except Exception as e:
+            logger.error(f"Error saving summary job to local JSON: {e}")
+
+    def get_summary_job(self, job_id):
+        try:
+            return self._read_data().get("summary_jobs", {}).get(job_id)
+        except Exception as e:
+            logger.error(f"Error getting summary job from local JSON: {e}")
+            return None
+
+    def compact(self):
+        """Drop expired entries, enforce cache size caps and rewrite the store.
+
+        Cached answers over CACHE_MAX_ENTRIES_PER_USER (per user) or
+        CACHE_MAX_ENTRIES (overall) are evicted least recently used first;
+        0 disables a cap.
+        """
+        try:
+            expired = 0
+            evicted = 0
+
+            # Measure the file under the lock, so concurrent writes don't skew bytes_freed
+            with file_lock(self.path):
+                size_before = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                data = self._load_data()
+
+                for section, ttl in _expiring_sections():
+                    entries = data.get(section, {})
+                    stale = [key for key, entry in entries.items() if _is_expired(entry, ttl)]
+                    for key in stale:
+                        del entries[key]
+                    expired += len(stale)
+
+                queries = data.get("queries", {})
+                for query_id, accessed in self._drain_access_log().items():
+                    if query_id in queries and accessed > queries[query_id].get("last_accessed", ""):
+                        queries[query_id]["last_accessed"] = accessed
+
+                by_recency = sorted(
+                    queries,
+                    key=lambda query_id: queries[query_id].get("last_accessed", queries[query_id]["timestamp"]),
+                    reverse=True
+                )
+
+                per_user_cap = int(os.getenv("CACHE_MAX_ENTRIES_PER_USER", 0))
+                global_cap = int(os.getenv("CACHE_MAX_ENTRIES", 0))
+                kept_per_user = defaultdict(int)
+                kept = 0
+                for query_id in by_recency:
+                    user_id = queries[query_id].get("user_id")
+                    if (per_user_cap and kept_per_user[user_id] >= per_user_cap) or (global_cap and kept >= global_cap):
+                        del queries[query_id]
+                        evicted += 1
+                        continue
+                    kept_per_user[user_id] += 1
+                    kept += 1
+
+                self._write_data(data)
+                size_after = os.path.getsize(self.path)
+
+            stats = {"expired": expired, "evicted": evicted, "bytes_freed": size_before - size_after}
+            logger.info(f"Compacted local JSON: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"Error compacting local JSON: {e}")
+            return {"expired": 0, "evicted": 0, "bytes_freed": 0, "error": str(e)}
+
 
 class FirestoreDB:
     def __init__(self, client):
@@ -203,16 +468,54 @@ class FirestoreDB:
                 "name": name,
                 "upload_date": datetime.now().isoformat(),
                 "chunk_count": len(chunks),
-                "status": "processed"
+                "status": "processed",
+                **chunking_stats(chunks)
             }
 
             # Save as a document in the transcripts collection
             doc_ref = self.client.collection("transcripts").document(transcript_id)
             doc_ref.set(metadata)
+            self._bump_version(user_id, "transcripts")
             logger.info(f"Saved transcript metadata to Firestore: {transcript_id} for user: {user_id}")
         except Exception as e:
             logger.error(f"Error saving transcript metadata to Firestore: {e}")
 
+    def update_transcript_chunks(self, user_id, transcript_id, chunks):
+        try:
+            doc_ref = self.client.collection("transcripts").document(transcript_id)
+            doc_ref.update({
+                "chunk_count": len(chunks),
+                **updated_chunking_stats(chunks),
+                "updated_date": datetime.now().isoformat()
+            })
+            self._bump_version(user_id, "transcripts")
+            logger.info(f"Updated chunk count in Firestore: {transcript_id} for user: {user_id}")
+        except Exception as e:
+            logger.error(f"Error updating chunk count in Firestore: {e}")
+
+    def invalidate_cached_responses(self, user_id, transcript_id):
+        try:
+            query_ref = self.client.collection("queries").where(
+                filter=firestore.FieldFilter("user_id", "==", user_id)
+            ).where(
+                filter=firestore.FieldFilter("transcript_id", "==", transcript_id)
+            )
+
+            batch = self.client.batch()
+            count = 0
+            for doc in query_ref.stream():
+                batch.delete(doc.reference)
+                count += 1
+                # Firestore caps a batch at 500 writes
+                if count % 500 == 0:
+                    batch.commit()
+                    batch = self.client.batch()
+            if count % 500:
+                batch.commit()
+            logger.info(f"Invalidated {count} cached responses in Firestore: {transcript_id}")
+        except Exception as e:
+            logger.error(f"Error invalidating cached responses in Firestore: {e}")
+
     def has_transcript_access(self, user_id, transcript_id):
         try:
             # Get the transcript document
@@ -227,7 +530,7 @@ class FirestoreDB:
             logger.error(f"Error checking transcript access in Firestore: {e}")
             return False
 
-    def get_cached_response(self, user_id, transcript_id, query):
+    def get_cached_response(self, user_id, transcript_id, query, window=None):
         try:
             ttl = int(os.getenv("CACHE_TTL_SECONDS", 604800))
 
@@ -239,6 +542,8 @@ class FirestoreDB:
                 filter=firestore.FieldFilter("transcript_id", "==", transcript_id)
             ).where(
                 filter=firestore.FieldFilter("query", "==", query)
+            ).where(
+                filter=firestore.FieldFilter("window", "==", window)
             ).order_by(
                 "timestamp", direction="DESCENDING"
             ).limit(1)
@@ -256,7 +561,7 @@ class FirestoreDB:
             logger.error(f"Error getting cached response from Firestore: {e}")
             return None
 
-    def cache_response(self, user_id, transcript_id, query, response):
+    def cache_response(self, user_id, transcript_id, query, response, window=None):
         try:
             # Generate a unique query ID
             query_id = str(uuid.uuid4())
@@ -266,6 +571,7 @@ class FirestoreDB:
                 "user_id": user_id,
                 "transcript_id": transcript_id,
                 "query": query,
+                "window": window,
                 "response": response,
                 "timestamp": datetime.now().isoformat()
             }
@@ -311,7 +617,7 @@ class FirestoreDB:
             logger.error(f"Error getting user transcripts from Firestore: {e}")
             return {}
 
-    def save_query_history(self, user_id: str, transcript_id: str, query: str, response: dict):
+    def save_query_history(self, user_id: str, transcript_id: str, query: str, response: dict, window: str = None):
         """Save complete query history"""
         try:
             query_id = str(uuid.uuid4())
@@ -320,6 +626,7 @@ class FirestoreDB:
                 "user_id": user_id,
                 "transcript_id": transcript_id,
                 "query": query,
+                "window": window,
                 "response": response,
                 "timestamp": datetime.now().isoformat(),
                 "type": "query_history"
@@ -327,6 +634,7 @@ class FirestoreDB:
 
             doc_ref = self.client.collection("query_history").document(query_id)
             doc_ref.set(query_data)
+            self._bump_version(user_id, "query_history")
             logger.info(f"Saved query history: {query_id}")
         except Exception as e:
             logger.error(f"Error saving query history: {e}")
@@ -357,6 +665,93 @@ class FirestoreDB:
             logger.error(f"Error getting query history: {e}")
             return []
 
+    def _bump_version(self, user_id, scope):
+        # Server-side increment, so concurrent writers never lose a bump
+        doc_ref = self.client.collection("user_versions").document(user_id)
+        doc_ref.set({scope: firestore.Increment(1)}, merge=True)
+
+    def get_user_version(self, user_id, scope):
+        """Counter bumped on every write to the user's `scope` ("transcripts" or "query_history")"""
+        try:
+            doc = self.client.collection("user_versions").document(user_id).get()
+            return (doc.to_dict() or {}).get(scope, 0) if doc.exists else 0
+        except Exception as e:
+            logger.error(f"Error getting user version from Firestore: {e}")
+            return None
+
+    def get_cached_summaries(self, keys):
+        try:
+            refs = [self.client.collection("summaries").document(key) for key in keys]
+            summaries = {}
+            for doc in self.client.get_all(refs):
+                if doc.exists:
+                    summaries[doc.id] = doc.to_dict()["summary"]
+            return summaries
+        except Exception as e:
+            logger.error(f"Error getting cached summaries from Firestore: {e}")
+            return {}
+
+    def cache_summaries(self, summaries):
+        try:
+            timestamp = datetime.now().isoformat()
+            items = list(summaries.items())
+            # Firestore caps a batch at 500 writes
+            for i in range(0, len(items), 500):
+                batch = self.client.batch()
+                for key, summary in items[i:i + 500]:
+                    doc_ref = self.client.collection("summaries").document(key)
+                    batch.set(doc_ref, {"summary": summary, "timestamp": timestamp})
+                batch.commit()
+            logger.info(f"Cached {len(summaries)} summaries in Firestore")
+        except Exception as e:
+            logger.error(f"Error caching summaries in Firestore: {e}")
+
+    def save_summary_job(self, job_id, job):
+        try:
+            doc_ref = self.client.collection("summary_jobs").document(job_id)
+            doc_ref.set(_summary_job_record(job))
+            logger.info(f"Saved summary job to Firestore: {job_id}")
+        except Exception as e:
+            logger.error(f"Error saving summary job to Firestore: {e}")
+
+    def get_summary_job(self, job_id):
+        try:
+            doc = self.client.collection("summary_jobs").document(job_id).get()
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"Error getting summary job from Firestore: {e}")
+            return None
+
+    def compact(self):
+        """Delete expired cache, error and summary job documents in paged, batched deletes"""
+        page_size = int(os.getenv("COMPACTION_PAGE_SIZE", 500))
+        expired = 0
+        try:
+            for collection, ttl in _expiring_sections():
+                cutoff = (datetime.now() - timedelta(seconds=ttl)).isoformat()
+                while True:
+                    docs = list(self.client.collection(collection).where(
+                        filter=firestore.FieldFilter("timestamp", "<", cutoff)
+                    ).limit(page_size).stream())
+                    if not docs:
+                        break
+
+                    batch = self.client.batch()
+                    for doc in docs:
+                        batch.delete(doc.reference)
+                    batch.commit()
+                    expired += len(docs)
+                    if len(docs) < page_size:
+                        break
+
+            # Firestore manages its own storage, so freed bytes are not observable here
+            stats = {"expired": expired, "evicted": 0, "bytes_freed": None}
+            logger.info(f"Compacted Firestore: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"Error compacting Firestore: {e}")
+            return {"expired": expired, "evicted": 0, "bytes_freed": None, "error": str(e)}
+
     # Add similar methods to LocalJSONDB class
 
 
@@ -366,22 +761,30 @@ def save_transcript_metadata(user_id, transcript_id, name, chunks):
     db = get_db()
     db.save_transcript_metadata(user_id, transcript_id, name, chunks)
 
+def update_transcript_chunks(user_id, transcript_id, chunks):
+    db = get_db()
+    db.update_transcript_chunks(user_id, transcript_id, chunks)
+
+def invalidate_cached_responses(user_id, transcript_id):
+    db = get_db()
+    db.invalidate_cached_responses(user_id, transcript_id)
+
 def has_transcript_access(user_id, transcript_id):
     db = get_db()
     return db.has_transcript_access(user_id, transcript_id)
 
-def get_cached_response(user_id, transcript_id, query):
+def get_cached_response(user_id, transcript_id, query, window=None):
     db = get_db()
-    return db.get_cached_response(user_id, transcript_id, query)
+    return db.get_cached_response(user_id, transcript_id, query, window)
 
-def cache_response(user_id, transcript_id, query, response):
+def cache_response(user_id, transcript_id, query, response, window=None):
     db = get_db()
-    db.cache_response(user_id, transcript_id, query, response)
+    db.cache_response(user_id, transcript_id, query, response, window)
 
 # FIXED: These functions were calling the wrong methods
-def save_query_history(user_id, transcript_id, query, response):
+def save_query_history(user_id, transcript_id, query, response, window=None):
     db = get_db()
-    db.save_query_history(user_id, transcript_id, query, response)  # Fixed: was calling cache_response
+    db.save_query_history(user_id, transcript_id, query, response, window)  # Fixed: was calling cache_response
 
 def get_query_history(user_id, transcript_id=None, limit=50):
     db = get_db()
@@ -393,4 +796,28 @@ def save_processing_error(user_id, transcript_id, error_message):
 
 def get_user_transcripts(user_id):
     db = get_db()
-    return db.get_user_transcripts(user_id)
\ No newline at end of file
+    return db.get_user_transcripts(user_id)
+
+def get_user_version(user_id, scope):
+    db = get_db()
+    return db.get_user_version(user_id, scope)
+
+def get_cached_summaries(keys):
+    db = get_db()
+    return db.get_cached_summaries(keys)
+
+def cache_summaries(summaries):
+    db = get_db()
+    db.cache_summaries(summaries)
+
+def save_summary_job(job_id, job):
+    db = get_db()
+    db.save_summary_job(job_id, job)
+
+def get_summary_job(job_id):
+    db = get_db()
+    return db.get_summary_job(job_id)
+
+def compact():
+    db = get_db()
+    return db.compact()
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from langchain.prompts import PromptTemplate
+from . import storage
+from .rag import get_llm, get_vectorstore
+from .resilience import admit, llm_breaker, llm_limiter
+
+logger = logging.getLogger(__name__)
+
+# Shared by every summary in the process, so concurrent jobs don't multiply the LLM load
+_summary_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SUMMARY_MAX_CONCURRENCY", 4)),
+    thread_name_prefix="summary"
+)
+
+# Bump when the prompts change so cached node summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+
+LEAF_PROMPT = PromptTemplate(
+    template="""Summarize the following transcript excerpt ({start_time} - {end_time}) in a few sentences.
+    Keep names, figures and decisions. Do not add information that is not in the excerpt.
+
+    {text}
+
+    Summary:""",
+    input_variables=["start_time", "end_time", "text"]
+)
+
+REDUCE_PROMPT = PromptTemplate(
+    template="""The following are summaries of consecutive sections of a transcript, each with its time range.
+    Combine them into one concise summary of {start_time} - {end_time}, keeping the most important points
+    and mentioning timestamps where relevant.
+
+    {text}
+
+    Summary:""",
+    input_variables=["start_time", "end_time", "text"]
+)
+
+
+def _node_key(kind, payload):
+    provider = os.getenv("LLM_PROVIDER", "ollama")
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini") if provider == "openai" else os.getenv("OLLAMA_MODEL", "mistral")
+    content = f"{SUMMARY_PROMPT_VERSION}|{provider}|{model}|{kind}|{payload}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_transcript_chunks(user_id, transcript_id):
+    """Fetch a transcript's chunks from the vector store in transcript order"""
+    found = get_vectorstore(user_id, transcript_id).get(include=["documents", "metadatas"])
+    chunks = [
+        {"text": text, "start_time": metadata["start_time"], "end_time": metadata["end_time"],
+         "index": metadata.get("chunk_index", 0)}
+        for text, metadata in zip(found["documents"], found["metadatas"])
+    ]
+    chunks.sort(key=lambda chunk: chunk["index"])
+    return chunks
+
+
+def _summarize_level(nodes, prompt):
+    """Fill in the summary of every node in `nodes`, using cached summaries where possible"""
+    cached = storage.get_cached_summaries([node["key"] for node in nodes])
+    pending = [node for node in nodes if node["key"] not in cached]
+    for node in nodes:
+        if node["key"] in cached:
+            node["summary"] = cached[node["key"]]
+
+    if not pending:
+        return 0
+
+    llm = get_llm()
+
+    def summarize(node):
+        # Summaries count against the same breaker and in-flight limit as /query,
+        # but wait for a slot instead of degrading
+        if admit(llm_breaker, llm_limiter, wait=True):
+            raise RuntimeError("LLM unavailable: circuit breaker is open")
+        try:
+            summary = llm.invoke(prompt.format(
+                start_time=node["start_time"],
+                end_time=node["end_time"],
+                text=node["text"]
+            )).strip()
+            llm_breaker.record_success()
+            return summary
+        except Exception:
+            llm_breaker.record_failure()
+            raise
+        finally:
+            llm_limiter.release()
+
+    for node, summary in zip(pending, _summary_pool.map(summarize, pending)):
+        node["summary"] = summary
+
+    storage.cache_summaries({node["key"]: node["summary"] for node in pending})
+    return len(pending)
+
+
+def summarize_transcript(user_id, transcript_id):
+    """Summarize a whole transcript as a tree of map-reduce summaries.
+
+    Leaves are the transcript chunks and each level above combines groups of
+    SUMMARY_FANOUT summaries from the level below. Every node is cached by a
+    hash of its content, so re-runs and appended transcripts only call the
+    LLM for the branches whose input changed.
+    """
+    chunks = load_transcript_chunks(user_id, transcript_id)
+    if not chunks:
+        raise ValueError(f"No chunks found for transcript {transcript_id}")
+
+    fanout = max(2, int(os.getenv("SUMMARY_FANOUT", 4)))
+
+    level = [
+        {
+            "key": _node_key("leaf", f"{c['start_time']}|{c['end_time']}|{c['text']}"),
+            "start_time": c["start_time"],
+            "end_time": c["end_time"],
+            "text": c["text"]
+        }
+        for c in chunks
+    ]
+    generated = _summarize_level(level, LEAF_PROMPT)
+    sections = level
+
+    while len(level) > 1:
+        parents = []
+        for i in range(0, len(level), fanout):
+            children = level[i:i + fanout]
+            parents.append({
+                "key": _node_key("reduce", "|".join(child["key"] for child in children)),
+                "start_time": children[0]["start_time"],
+                "end_time": children[-1]["end_time"],
+                "text": "\n\n".join(
+                    f"[{child['start_time']} - {child['end_time']}] {child['summary']}" for child in children
+                )
+            })
+        generated += _summarize_level(parents, REDUCE_PROMPT)
+        sections = level
+        level = parents
+
+    root = level[0]
+    logger.info(f"Summarized transcript {transcript_id}: {len(chunks)} chunks, {generated} new LLM summaries")
+
+    return {
+        "transcript_id": transcript_id,
+        "summary": root["summary"],
+        "start_time": root["start_time"],
+        "end_time": root["end_time"],
+        "sections": [
+            {"start_time": node["start_time"], "end_time": node["end_time"], "summary": node["summary"]}
+            for node in sections
+        ]
+    }
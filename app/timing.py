@@ -0,0 +1,33 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Stage durations (ms) for the request being handled, reported in the Server-Timing header
+_stages = ContextVar("stages", default=None)
+
+
+@contextmanager
+def collect():
+    """Collect the durations of every `stage` run while handling one request"""
+    stages = {}
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time a block of work; a no-op outside `collect`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def server_timing_header(stages):
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in stages.items())
@@ -1,38 +1,73 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import re
-from typing import List, Dict
+from typing import Callable, List, Dict
 
 
-def parse_transcript(content: str) -> List[Dict]:
+def timestamp_to_seconds(timestamp: str) -> int:
+    """Convert an "HH:MM:SS" timestamp (or a plain number of seconds) to integer seconds"""
+    timestamp = str(timestamp).strip()
+    if timestamp.isdigit():
+        return int(timestamp)
+
+    parts = timestamp.split(":")
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid timestamp: {timestamp!r}")
+    hours, minutes, seconds = (int(part) for part in parts)
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_transcript(content: str, base_offset: int = 0) -> List[Dict]:
+    """Split "[HH:MM:SS] text" content into timestamped segments.
+
+    Each segment records the character range of its text in `content`,
+    shifted by `base_offset` when `content` was appended to an earlier transcript.
+    """
     pattern = r'\[(\d{2}:\d{2}:\d{2})\]\s*(.*?)(?=\[\d{2}:\d{2}:\d{2}\]|$)'
-    matches = re.findall(pattern, content, re.DOTALL)
+    matches = list(re.finditer(pattern, content, re.DOTALL))
 
     # Create segments with timestamps
     segments = []
-    for i, (timestamp, text) in enumerate(matches):
+    for i, match in enumerate(matches):
+        timestamp, raw_text = match.group(1), match.group(2)
         if i < len(matches) - 1:
-            end_time = matches[i + 1][0]
+            end_time = matches[i + 1].group(1)
         else:
             end_time = timestamp
 
+        text = raw_text.strip()
+        char_start = base_offset + match.start(2) + len(raw_text) - len(raw_text.lstrip())
         segments.append({
             "start_time": timestamp,
             "end_time": end_time,
-            "text": text.strip()
+            "text": text,
+            "char_start": char_start,
+            "char_end": char_start + len(text)
         })
 
     return segments
 
 
-def chunk_transcript_with_timestamps(segments: List[Dict], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[
-    Dict]:
-    """Chunk transcript with token-aware splitting while preserving timestamps"""
+def _content_offset(ts_map: Dict, pos: int):
+    """Translate a position in the joined chunking text back to the original transcript"""
+    if ts_map.get("char_start") is None:
+        return None
+    length = ts_map["char_end"] - ts_map["char_start"]
+    return ts_map["char_start"] + min(max(pos - ts_map["start_pos"], 0), length)
+
+
+def chunk_transcript_with_timestamps(segments: List[Dict], chunk_size: int = 1000, chunk_overlap: int = 200,
+                                     length_function: Callable[[str], int] = len) -> List[Dict]:
+    """Chunk transcript while preserving timestamps.
+
+    Sizes are measured with `length_function`: characters by default, or
+    tokens when given a tokenizer-based counter.
+    """
 
     # Use LangChain text splitter
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        length_function=len,
+        length_function=length_function,
         separators=["\n\n", "\n", " ", ""]
     )
 
@@ -50,7 +85,9 @@ def chunk_transcript_with_timestamps(segments: List[Dict], chunk_size: int = 100
             "start_pos": start_pos,
             "end_pos": end_pos,
             "start_time": segment["start_time"],
-            "end_time": segment["end_time"]
+            "end_time": segment["end_time"],
+            "char_start": segment.get("char_start"),
+            "char_end": segment.get("char_end")
         })
 
     # Split the text
@@ -58,31 +95,45 @@ def chunk_transcript_with_timestamps(segments: List[Dict], chunk_size: int = 100
 
     # Map chunks back to timestamps
     chunked_segments = []
-    current_pos = 0
+    search_pos = 0
 
     for chunk in chunks:
+        # Chunks overlap, so locate each one in the full text rather than
+        # assuming they are laid out back to back
+        current_pos = full_text.find(chunk, search_pos)
+        if current_pos == -1:
+            current_pos = search_pos
         chunk_end = current_pos + len(chunk)
+        search_pos = current_pos + 1
 
         # Find which timestamp segments this chunk overlaps with
         overlapping_segments = []
-        for ts_map in timestamp_map:
+        for index, ts_map in enumerate(timestamp_map):
             if (current_pos < ts_map["end_pos"] and chunk_end > ts_map["start_pos"]):
-                overlapping_segments.append(ts_map)
+                overlapping_segments.append((index, ts_map))
 
         if overlapping_segments:
-            start_time = overlapping_segments[0]["start_time"]
-            end_time = overlapping_segments[-1]["end_time"]
+            first_segment, first_map = overlapping_segments[0]
+            last_segment, last_map = overlapping_segments[-1]
+            start_time = first_map["start_time"]
+            end_time = last_map["end_time"]
+            char_start = _content_offset(first_map, current_pos)
+            char_end = _content_offset(last_map, chunk_end)
         else:
             # Fallback if no timestamps found
+            first_segment = last_segment = 0
             start_time = "00:00:00"
             end_time = "00:00:00"
+            char_start = char_end = None
 
         chunked_segments.append({
             "start_time": start_time,
             "end_time": end_time,
-            "text": chunk.strip()
+            "text": chunk.strip(),
+            "first_segment": first_segment,
+            "last_segment": last_segment,
+            "char_start": char_start,
+            "char_end": char_end
         })
 
-        current_pos = chunk_end
-
     return chunked_segments
\ No newline at end of file
@@ -0,0 +1,30 @@
+# Multi-worker deployment: gunicorn -c gunicorn.conf.py app.main:app
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app, and with it the embedding model, once in the master process
+preload_app = True
+os.environ.setdefault("PRELOAD_MODELS", "true")
+
+# HF fast tokenizers deadlock if their thread pool was used before fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def pre_fork(server, worker):
+    # Hide everything loaded so far from the garbage collector, so collections
+    # in the workers don't write to (and un-share) the preloaded model's pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split CPU threads between workers instead of each one using every core
+    try:
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
+    except ImportError:
+        pass
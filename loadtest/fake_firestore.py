@@ -0,0 +1,182 @@
+"""In-memory stand-in for the Firestore client used by `app.storage.FirestoreDB`.
+
+Supports the subset of the google-cloud-firestore API the app calls:
+collection/document references, set/get/update/delete (including
+Increment in merged sets), where() with FieldFilter, order_by, limit,
+stream, get_all and write batches.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class FakeFirestoreClient:
+    def __init__(self, latency=0.0):
+        # Optional per-call delay to approximate network round trips
+        self.latency = latency
+        self._collections = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references):
+        self._round_trip()
+        return [reference._snapshot() for reference in references]
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, client, collection, document_id):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+
+    def _store(self):
+        return self._client._collections[self._collection]
+
+    def _snapshot(self):
+        with self._client._lock:
+            return FakeSnapshot(self, copy.deepcopy(self._store().get(self.id)))
+
+    def get(self):
+        self._client._round_trip()
+        return self._snapshot()
+
+    def _set(self, data, merge=False):
+        with self._client._lock:
+            current = (self._store().get(self.id) if merge else None) or {}
+            document = {**current, **copy.deepcopy(data)}
+            # Apply firestore.Increment sentinels to the stored value
+            for field, value in data.items():
+                if type(value).__name__ == "Increment":
+                    document[field] = (current.get(field) or 0) + value.value
+            self._store()[self.id] = document
+
+    def _update(self, fields):
+        with self._client._lock:
+            if self.id not in self._store():
+                raise KeyError(f"No document to update: {self._collection}/{self.id}")
+            self._store()[self.id].update(copy.deepcopy(fields))
+
+    def _delete(self):
+        with self._client._lock:
+            self._store().pop(self.id, None)
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        self._set(data, merge)
+
+    def update(self, fields):
+        self._client._round_trip()
+        self._update(fields)
+
+    def delete(self):
+        self._client._round_trip()
+        self._delete()
+
+
+class FakeQuery:
+    def __init__(self, client, collection, filters=(), order=None, limit_count=None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = order
+        self._limit = limit_count
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return FakeQuery(self._client, self._collection, self._filters + ((field_path, op_string, value),),
+                         self._order, self._limit)
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return FakeQuery(self._client, self._collection, self._filters, (field_path, direction), self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self._client, self._collection, self._filters, self._order, count)
+
+    def stream(self):
+        self._client._round_trip()
+        with self._client._lock:
+            matches = [
+                (document_id, copy.deepcopy(data))
+                for document_id, data in self._client._collections[self._collection].items()
+                if all(_OPERATORS[op](data.get(field), value) for field, op, value in self._filters)
+            ]
+        if self._order:
+            field, direction = self._order
+            matches.sort(key=lambda item: (item[1].get(field) is None, item[1].get(field)),
+                         reverse=str(direction).upper().startswith("DESC"))
+        if self._limit is not None:
+            matches = matches[:self._limit]
+
+        for document_id, data in matches:
+            reference = FakeDocumentReference(self._client, self._collection, document_id)
+            yield FakeSnapshot(reference, data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, name):
+        super().__init__(client, name)
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._client, self._collection, document_id or uuid.uuid4().hex)
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(lambda: reference._set(data, merge))
+
+    def update(self, reference, fields):
+        self._writes.append(lambda: reference._update(fields))
+
+    def delete(self, reference):
+        self._writes.append(reference._delete)
+
+    def commit(self):
+        self._client._round_trip()
+        for write in self._writes:
+            write()
+        self._writes = []
@@ -0,0 +1,121 @@
+"""Minimal Ollama-compatible HTTP server for load tests.
+
+Implements the endpoints the app uses (/api/generate, plus /api/tags and
+/api/version for health checks) and streams a canned answer at a
+configurable latency and token rate, so LLM cost can be dialled in without
+a GPU.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, first_token_latency=0.2, tokens_per_second=30.0,
+                 response_tokens=60, max_parallel=None):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        # Like a real Ollama host, only generate this many responses at once; the rest queue
+        self._slots = threading.BoundedSemaphore(max_parallel) if max_parallel else None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _tokens(self):
+        words = "This is a simulated answer from the load test model referencing [00:01:30] in the transcript".split()
+        return [f"{words[i % len(words)]} " for i in range(self.response_tokens)]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": []})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                model = request.get("model", "fake")
+
+                if server._slots:
+                    server._slots.acquire()
+                try:
+                    self._generate(model, stream=request.get("stream", True))
+                finally:
+                    if server._slots:
+                        server._slots.release()
+
+            def _generate(self, model, stream):
+                time.sleep(server.first_token_latency)
+                tokens = server._tokens()
+                delay = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+
+                def message(text, done):
+                    payload = {
+                        "model": model,
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                        "response": text,
+                        "done": done
+                    }
+                    if done:
+                        payload["done_reason"] = "stop"
+                        payload["eval_count"] = len(tokens)
+                    return payload
+
+                if not stream:
+                    time.sleep(delay * len(tokens))
+                    self._send_json(message("".join(tokens), True))
+                    return
+
+                # Stream NDJSON and let the closed connection delimit the body
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        time.sleep(delay)
+                        self.wfile.write((json.dumps(message(token, False)) + "\n").encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write((json.dumps(message("", True)) + "\n").encode("utf-8"))
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. LLM timeout); nothing left to do
+                    pass
+
+        return Handler
@@ -0,0 +1,319 @@
+"""Concurrent load test for the transcript analyzer API.
+
+Starts the app in-process on a local port, backed by a fake Ollama server
+and either the local JSON store or an in-memory Firestore double, then
+drives /upload, /query and /query-history at a configurable concurrency
+and mix. Latency percentiles, throughput, error rate and the per-stage
+breakdown reported in the app's Server-Timing header are written as JSON,
+so runs against different backend configurations can be compared.
+
+    python -m loadtest.run --concurrency 16 --duration 60 --mix query=8,upload=1,history=1 \
+        --storage memory --output results/memory-c16.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+from .fake_ollama import FakeOllamaServer
+
+WORDS = (
+    "founders investors market product revenue growth pitch round valuation customers team "
+    "hiring strategy pricing churn runway traction metrics board equity seed series launch"
+).split()
+
+QUESTIONS = [
+    "What was said about {word}?",
+    "Summarize the discussion of {word}.",
+    "When did the speaker mention {word}?",
+    "What advice was given on {word}?",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent client workers")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run the workload for")
+    parser.add_argument("--mix", default="query=8,upload=1,history=1",
+                        help="relative weights of query, upload and history requests")
+    parser.add_argument("--storage", choices=["local", "memory"], default="local",
+                        help="local JSON store or in-memory Firestore double")
+    parser.add_argument("--firestore-latency", type=float, default=0.0,
+                        help="simulated round trip per in-memory Firestore call, in seconds")
+    parser.add_argument("--users", type=int, default=4, help="users, each seeded with one transcript")
+    parser.add_argument("--segments", type=int, default=200, help="timestamped segments per transcript")
+    parser.add_argument("--query-pool", type=int, default=50,
+                        help="distinct questions per transcript; smaller pools mean more cache hits")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM time to first token, seconds")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0, help="fake LLM token rate")
+    parser.add_argument("--llm-response-tokens", type=int, default=80, help="tokens in each fake LLM answer")
+    parser.add_argument("--llm-parallel", type=int, default=4,
+                        help="requests the fake LLM serves at once; further requests queue")
+    parser.add_argument("--seed-timeout", type=float, default=600.0,
+                        help="seconds to wait for seed transcripts to be indexed")
+    parser.add_argument("--port", type=int, default=0, help="app port (default: a free port)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="loadtest-results.json", help="where to write the JSON report")
+    return parser.parse_args(argv)
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("query", "upload", "history"):
+            raise ValueError(f"Unknown request type in --mix: {name!r}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_transcript(rng, segments):
+    lines = []
+    for i in range(segments):
+        seconds = i * 15
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40)))
+        lines.append(f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}] {sentence.capitalize()}.")
+    return "\n".join(lines)
+
+
+def configure_environment(args, ollama_url, work_dir):
+    """Point the app at the fakes; must run before `app` is imported"""
+    os.environ.update({
+        "LLM_PROVIDER": "ollama",
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_MODEL": "loadtest",
+        "DATA_DIR": work_dir,
+        "CHROMA_DIR": os.path.join(work_dir, "chroma"),
+        "LOCAL_JSON_DB": os.path.join(work_dir, "local_store.json"),
+        # Never let a developer's Firestore credentials leak into a load test. The app
+        # re-runs load_dotenv() on import, which only skips keys that are already set,
+        # so blank them rather than removing them
+        "GOOGLE_APPLICATION_CREDENTIALS": "",
+        "FIRESTORE_PROJECT_ID": "",
+    })
+
+    from app import firestore
+    if args.storage == "memory":
+        from .fake_firestore import FakeFirestoreClient
+        firestore._firestore_client = FakeFirestoreClient(latency=args.firestore_latency)
+    else:
+        # Any non-None falsy client skips Firebase initialization and selects the local JSON store
+        firestore._firestore_client = False
+
+
+def start_app(port):
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("App server failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def parse_server_timing(header):
+    stages = {}
+    for entry in filter(None, (part.strip() for part in (header or "").split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(value)
+    return stages
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(values):
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else None,
+        "max": max(values) if values else None,
+    }
+
+
+async def upload(client, user_id, name, content):
+    files = {"file": (f"{name}.txt", content.encode("utf-8"), "text/plain")}
+    return await client.post("/upload", data={"user_id": user_id, "transcript_name": name}, files=files)
+
+
+async def seed_transcripts(client, args, rng):
+    """Upload one transcript per user and wait for indexing to finish"""
+    seeded = []
+    for i in range(args.users):
+        user_id = f"loadtest-user-{i}"
+        response = await upload(client, user_id, f"seed-{i}", make_transcript(rng, args.segments))
+        response.raise_for_status()
+        seeded.append((user_id, response.json()["transcript_id"]))
+
+    deadline = time.monotonic() + args.seed_timeout
+    for user_id, transcript_id in seeded:
+        while True:
+            transcripts = (await client.get(f"/transcripts/{user_id}")).json()
+            if transcript_id in transcripts:
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Seed transcript {transcript_id} was not indexed within {args.seed_timeout}s")
+            await asyncio.sleep(0.2)
+    return seeded
+
+
+async def run_worker(worker_id, client, args, rng, weights, seeded, deadline, records):
+    kinds, kind_weights = zip(*weights.items())
+    upload_count = 0
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, kind_weights)[0]
+        user_id, transcript_id = rng.choice(seeded)
+
+        started = time.perf_counter()
+        try:
+            if kind == "query":
+                question = QUESTIONS[rng.randrange(len(QUESTIONS))].format(word=WORDS[rng.randrange(len(WORDS))])
+                question = f"{question} ({rng.randrange(args.query_pool)})"
+                response = await client.post("/query", json={
+                    "user_id": user_id, "transcript_id": transcript_id, "query": question
+                })
+            elif kind == "upload":
+                upload_count += 1
+                response = await upload(client, user_id, f"load-{worker_id}-{upload_count}",
+                                        make_transcript(rng, max(10, args.segments // 4)))
+            else:
+                response = await client.get(f"/query-history/{user_id}", params={"limit": 20})
+
+            ok = response.status_code < 400
+            body = response.json() if ok else None
+            records.append({
+                "kind": kind,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "ok": ok,
+                "status": response.status_code,
+                "degraded": bool(isinstance(body, dict) and body.get("degraded")),
+                "stages": parse_server_timing(response.headers.get("server-timing")),
+            })
+        except httpx.HTTPError as e:
+            records.append({
+                "kind": kind,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "ok": False,
+                "status": None,
+                "error": type(e).__name__,
+                "degraded": False,
+                "stages": {},
+            })
+
+
+def build_report(args, records, elapsed):
+    endpoints = {}
+    for kind in sorted({record["kind"] for record in records}):
+        kind_records = [record for record in records if record["kind"] == kind]
+        stage_values = defaultdict(list)
+        for record in kind_records:
+            for name, duration in record["stages"].items():
+                stage_values[name].append(duration)
+
+        errors = sum(not record["ok"] for record in kind_records)
+        endpoints[kind] = {
+            "requests": len(kind_records),
+            "errors": errors,
+            "error_rate": errors / len(kind_records),
+            "degraded": sum(record["degraded"] for record in kind_records),
+            "throughput_rps": len(kind_records) / elapsed,
+            "latency_ms": summarize_latencies([record["latency_ms"] for record in kind_records]),
+            "stages_ms": {name: summarize_latencies(values) for name, values in sorted(stage_values.items())},
+        }
+
+    errors = sum(not record["ok"] for record in records)
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "duration_seconds": elapsed,
+        "requests": len(records),
+        "throughput_rps": len(records) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(records) if records else 0.0,
+        "latency_ms": summarize_latencies([record["latency_ms"] for record in records]),
+        "endpoints": endpoints,
+    }
+
+
+async def run_load(args, base_url):
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        print(f"Seeding {args.users} transcripts of {args.segments} segments...", file=sys.stderr)
+        seeded = await seed_transcripts(client, args, rng)
+
+        print(f"Running {args.concurrency} workers for {args.duration:.0f}s...", file=sys.stderr)
+        records = []
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            run_worker(i, client, args, random.Random(args.seed * 1000 + i), weights, seeded, deadline, records)
+            for i in range(args.concurrency)
+        ))
+        return build_report(args, records, time.monotonic() - started)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ollama = FakeOllamaServer(
+        first_token_latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        response_tokens=args.llm_response_tokens,
+        max_parallel=args.llm_parallel,
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as work_dir:
+        configure_environment(args, ollama.base_url, work_dir)
+        port = args.port or free_port()
+        server, thread = start_app(port)
+        try:
+            report = asyncio.run(run_load(args, f"http://127.0.0.1:{port}"))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+            ollama.stop()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{report['requests']} requests in {report['duration_seconds']:.1f}s: "
+          f"{report['throughput_rps']:.1f} req/s, error rate {report['error_rate']:.2%}")
+    for kind, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"  {kind:8s} {stats['requests']:6d} req  p50 {latency['p50']:.0f}ms  "
+              f"p95 {latency['p95']:.0f}ms  p99 {latency['p99']:.0f}ms  errors {stats['errors']}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
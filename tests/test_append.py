@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from app.manifest import build_manifest, split_for_append
+from app.utils import chunk_transcript_with_timestamps, parse_transcript
+
+WORDS = "founders market product revenue pitch round valuation customers team pricing runway".split()
+
+
+def make_segments(rng, count, first_second=0):
+    lines = []
+    for i in range(count):
+        seconds = first_second + i * 15
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+        lines.append(f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}] {words}.")
+    return "\n".join(lines)
+
+
+def chunk(segments, start_index=0):
+    chunks = chunk_transcript_with_timestamps(segments, chunk_size=200, chunk_overlap=80)
+    for offset, c in enumerate(chunks):
+        c["index"] = start_index + offset
+        c["id"] = f"t-{c['index']:06d}"
+    return chunks
+
+
+def append(manifest, content):
+    kept, segments, tail_start = split_for_append(manifest, parse_transcript(content))
+    new_chunks = chunk(segments, start_index=len(kept))
+    return build_manifest(new_chunks, segments, segment_offset=tail_start, previous_chunks=kept), new_chunks
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_append_keeps_every_segment(seed):
+    rng = random.Random(seed)
+    parts = [make_segments(rng, rng.randint(1, 12), first_second=i * 1000) for i in range(4)]
+
+    manifest = build_manifest(chunk(parse_transcript(parts[0])), parse_transcript(parts[0]))
+    for part in parts[1:]:
+        manifest, new_chunks = append(manifest, part)
+
+        # Every segment of the transcript so far is still covered by some chunk
+        segment_count = manifest["segment_count"]
+        covered = set()
+        for entry in manifest["chunks"]:
+            covered.update(range(entry["first_segment"], entry["last_segment"] + 1))
+        assert covered == set(range(segment_count))
+        assert [entry["index"] for entry in manifest["chunks"]] == list(range(len(manifest["chunks"])))
+
+        # The re-chunked text covers the stored tail and the appended text
+        text = " ".join(c["text"] for c in new_chunks)
+        for segment in parse_transcript(part):
+            for word in segment["text"].split()[:3]:
+                assert word in text
+
+    full = "\n".join(parts)
+    assert manifest["segment_count"] == len(parse_transcript(full))
+
+
+def test_append_cost_stays_bounded():
+    rng = random.Random(0)
+    first = make_segments(rng, 40)
+    manifest = build_manifest(chunk(parse_transcript(first)), parse_transcript(first))
+    for i in range(1, 30):
+        part = make_segments(rng, 5, first_second=i * 1000)
+        kept, segments, _ = split_for_append(manifest, parse_transcript(part))
+        manifest, _ = append(manifest, part)
+
+        # Only the last chunk's segments are carried over, however long the transcript grows
+        assert len(manifest["tail_segments"]) <= 20
+        assert len(segments) <= 20 + 5
+        assert len(kept) > 0
@@ -0,0 +1,16 @@
+import pytest
+
+from app.lexical import is_keyword_lookup
+
+
+@pytest.mark.parametrize("query", ['"series A"', "AB-1234", "v2.1 release", "Acme Corp", "OpenAI", "the 2019 round"])
+def test_keyword_lookups(query):
+    assert is_keyword_lookup(query)
+
+
+@pytest.mark.parametrize("query", [
+    "Is it good?", "Any decisions made?", "Did pricing change?", "Did pricing change", "pricing",
+    "What about AB-1234?", "team hiring strategy plans", ""
+])
+def test_questions_are_not_keyword_lookups(query):
+    assert not is_keyword_lookup(query)
@@ -0,0 +1,30 @@
+from app.resilience import CircuitBreaker, ConcurrencyLimiter, admit
+
+
+def open_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_shed_call_does_not_claim_half_open_trial():
+    breaker, limiter = open_breaker(), ConcurrencyLimiter(1)
+    assert limiter.try_acquire()
+
+    assert admit(breaker, limiter) == "overloaded"
+    limiter.release()
+
+    # The next call still gets the trial, and its outcome closes the breaker
+    assert admit(breaker, limiter) is None
+    breaker.record_success()
+    limiter.release()
+    assert breaker.state == "closed"
+
+
+def test_refused_by_breaker_releases_limiter_slot():
+    breaker, limiter = open_breaker(), ConcurrencyLimiter(2)
+    assert admit(breaker, limiter) is None  # takes the trial
+
+    assert admit(breaker, limiter) == "unavailable"
+    assert limiter.in_flight == 1